@@ -1,18 +1,30 @@
 import asyncpg
+import hashlib
 import httpx
+import jwt
+import time
 from functools import wraps
+from redis import asyncio as aioredis
 from uuid import UUID
 from fastapi import Depends, HTTPException, Request, Body, status
 from typing import Optional
-from app.api.utils.pass_utils import hash_password
-from app.db.functions import execute_get_user_by_id
-from app.db.procedures import execute_create_user, execute_update_user
+from app.api.utils.auth_client import AuthServiceUnavailable, auth_client
+from app.api.utils.cache import TTLCache
+from app.api.utils.hashing import password_hasher
+from app.api.utils.singleflight import SingleFlight
+from app.db.procedures import execute_create_user, execute_partial_update_user
+from app.db.redis_client import get_redis_client
+from app.db.user_cache import invalidate_user
 from app.core.config import settings
-from app.schemas.users import UserCreate, UserCreateResponse
+from app.schemas.users import UserCreate, UserCreateResponse, UserUpdate
+
+token_cache = TTLCache(maxsize=settings.token_cache_maxsize, ttl=settings.token_cache_ttl)
+# одновременные проверки одного токена выполняют одно обращение к сервису auth
+token_verifications = SingleFlight('verify_token')
 
 
 async def handle_user_creation(conn: asyncpg.Connection, user: UserCreate) -> UserCreateResponse:
-    hashed_password = hash_password(user.hashed_pass)
+    hashed_password = await password_hasher.hash(user.hashed_pass)
     
     user_id = await execute_create_user(
         conn=conn,
@@ -35,29 +47,23 @@ async def handle_user_creation(conn: asyncpg.Connection, user: UserCreate) -> Us
         role=user.role
     )
 
-async def handle_user_update(conn: asyncpg.Connection, user_id: UUID, user_data: dict) -> dict:
-    existing_user = await execute_get_user_by_id(conn, user_id)
-    if not existing_user:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='User not found')
-    
-    new_password = user_data.get('hashed_pass')
-    if new_password:
-        hashed_password = hash_password(new_password)
-    else:
-        hashed_password = existing_user['hashed_pass']
-    await execute_update_user(
+async def handle_user_update(
+    conn: asyncpg.Connection, redis: aioredis.Redis, user_id: UUID, user_update: UserUpdate
+) -> dict:
+    """Частичное обновление пользователя одним запросом со сбросом его записи в кэше"""
+    new_password = user_update.hashed_pass
+    hashed_password = await password_hasher.hash(new_password) if new_password else None
+
+    updated_user = await execute_partial_update_user(
         conn=conn,
         user_id=user_id,
-        username=user_data.get('username', existing_user['username']),
-        email=user_data.get('email', existing_user['email']),
-        hashed_pass=hashed_password,
-        phone=user_data.get('phone', existing_user['phone']),
-        is_verified=user_data.get('is_verified', existing_user['is_verified']),
-        rating=user_data.get('rating', existing_user['rating']),
-        role=user_data.get('role', existing_user['role'])
+        fields=user_update.changed_fields(),
+        hashed_pass=hashed_password
     )
-    
-    updated_user = await execute_get_user_by_id(conn, user_id)
+    if not updated_user:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='User not found')
+
+    await invalidate_user(redis, user_id)
     return {
         'id': user_id,
         'username': updated_user['username'],
@@ -68,6 +74,92 @@ async def handle_user_update(conn: asyncpg.Connection, user_id: UUID, user_data:
         'role': updated_user['role']
     }
 
+def _token_cache_key(token: str) -> str:
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def _token_ttl(token: str) -> Optional[float]:
+    """Оставшееся время жизни токена по claim exp (без проверки подписи)"""
+    try:
+        payload = jwt.decode(token, options={'verify_signature': False})
+    except jwt.InvalidTokenError:
+        return None
+    exp = payload.get('exp')
+    if exp is None:
+        return None
+    return float(exp) - time.time()
+
+
+async def is_token_revoked(token: str, payload: dict) -> bool:
+    """Проверка токена по списку отозванных в Redis (по jti или хэшу токена)"""
+    token_id = payload.get('jti') or _token_cache_key(token)
+    return bool(await get_redis_client().exists(f'{settings.token_revocation_prefix}:{token_id}'))
+
+
+def decode_access_token(token: str) -> dict:
+    """Локальная проверка подписи и срока действия access токена без обращения к auth"""
+    payload = jwt.decode(
+        token,
+        settings.jwt_secret_key,
+        algorithms=[settings.jwt_algorithm],
+        audience=settings.jwt_access_audience,
+        options={'require': ['exp', 'aud', 'type']},
+    )
+    if payload['type'] != settings.jwt_access_token_type:
+        raise jwt.InvalidTokenError('Token is not an access token')
+    if not (payload.get('user_id') or payload.get('sub')):
+        raise jwt.InvalidTokenError('Token has no subject')
+    return payload
+
+
+async def verify_access_token(request: Request, token: str) -> dict:
+    """Проверка access токена с кэшированием и дедупликацией в рамках запроса"""
+    verified = getattr(request.state, 'verified_token', None)
+    if verified is not None and verified[0] == token:
+        return verified[1]
+
+    mode = settings.token_verification_mode
+    if mode in ('local', 'hybrid'):
+        try:
+            payload = decode_access_token(token)
+        except jwt.ExpiredSignatureError:
+            raise HTTPException(status_code=401, detail='Access token expired')
+        except jwt.InvalidTokenError:
+            if mode == 'local':
+                raise HTTPException(status_code=401, detail='Invalid access token')
+            payload = None
+        if payload is not None:
+            if settings.token_revocation_check and await is_token_revoked(token, payload):
+                raise HTTPException(status_code=401, detail='Access token revoked')
+            token_data = {**payload, 'user_id': payload.get('user_id') or payload.get('sub')}
+            request.state.verified_token = (token, token_data)
+            return token_data
+
+    cache_key = _token_cache_key(token)
+    token_data = token_cache.get(cache_key) if settings.token_cache_enabled else None
+    if token_data is None:
+        token_data = await token_verifications.do(cache_key, lambda: _verify_remote(token, cache_key))
+
+    request.state.verified_token = (token, token_data)
+    return token_data
+
+
+async def _verify_remote(token: str, cache_key: str) -> dict:
+    """Проверка токена в сервисе auth с сохранением результата в кэш"""
+    try:
+        response = await auth_client.verify_token(token)
+    except AuthServiceUnavailable:
+        raise
+    except httpx.RequestError:
+        raise HTTPException(status_code=500, detail='Auth service is unavailable')
+    if response.status_code != 200:
+        raise HTTPException(status_code=response.status_code, detail=response.text)
+    token_data = response.json()
+    if settings.token_cache_enabled:
+        token_cache.set(cache_key, token_data, ttl=_token_ttl(token))
+    return token_data
+
+
 async def get_current_user(request: Request):
     """Проверка аутентификации через обращение к сервису auth"""
     token = request.headers.get('Authorization')
@@ -76,18 +168,13 @@ async def get_current_user(request: Request):
 
     token = token.split(' ')[1]
 
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(f'{settings.auth_service_url}/verify_token', json={'token': token})
-            if response.status_code == 200:
-                token_data = response.json()
-                return token_data['user_id']
-            else:
-                token_data = response.json()
-                print(token_data)
-                raise HTTPException(status_code=response.status_code, detail='Invalid token')
-        except httpx.RequestError:
-            raise HTTPException(status_code=500, detail='Auth service is unavailable')
+    try:
+        token_data = await verify_access_token(request, token)
+    except HTTPException as e:
+        if e.status_code == 500:
+            raise
+        raise HTTPException(status_code=e.status_code, detail='Invalid token')
+    return token_data['user_id']
 
 async def validate_and_refresh_token(
     request: Request
@@ -101,12 +188,11 @@ async def validate_and_refresh_token(
     body = await request.json()
     refresh_token: Optional[str] = body.get("refresh_token")
 
-    async with httpx.AsyncClient() as client:
-        response = await client.post(f'{settings.auth_service_url}/verify_token', json={"token": access_token})
+    response = await auth_client.verify_token(access_token)
 
     if response.status_code == 401:
         if refresh_token:
-            refresh_response = await client.post(f'{settings.auth_service_url}/refresh_token', json={"refresh_token": refresh_token})
+            refresh_response = await auth_client.refresh_token(refresh_token)
             if refresh_response.status_code == 200:
                 new_access_token = refresh_response.json().get('access_token')
                 return {
@@ -152,22 +238,13 @@ def token_required(func):
         except Exception:
             refresh_token = None
 
-        async with httpx.AsyncClient() as client:
-            if refresh_token:
-                response = await client.post(
-                    f'{settings.auth_service_url}/refresh_token',
-                    json={"refresh_token": refresh_token},
-                    headers={"Authorization": f"Bearer {access_token}"}
-                )
-            else:
-                response = await client.post(
-                    f'{settings.auth_service_url}/verify_token',
-                    json={"token": access_token}
-                )
-
-            if response.status_code == 200:
-                return await func(*args, **kwargs)
-            else:
+        if refresh_token:
+            response = await auth_client.refresh_token(refresh_token, access_token)
+            if response.status_code != 200:
                 raise HTTPException(status_code=response.status_code, detail=response.text)
+        else:
+            await verify_access_token(request, access_token)
+
+        return await func(*args, **kwargs)
 
     return wrapper
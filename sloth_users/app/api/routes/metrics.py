@@ -0,0 +1,44 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.api.utils.auth_client import auth_client
+from app.api.utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN
+from app.api.utils.hashing import password_hasher
+from app.core.metrics import REGISTRY, Gauge
+from app.db import get_pool_stats
+from app.db.audit import audit_writer
+
+router = APIRouter()
+
+
+def _db_pool_gauge() -> dict:
+    stats = get_pool_stats()
+    if not stats['initialized']:
+        return {}
+    return {('size',): stats['size'], ('idle',): stats['idle'], ('in_use',): stats['in_use']}
+
+
+def _password_hasher_gauge() -> dict:
+    stats = password_hasher.stats()
+    return {('queue_depth',): stats['queue_depth'], ('in_flight',): stats['in_flight']}
+
+
+def _audit_queue_gauge() -> dict:
+    return {(): audit_writer.stats()['queue_depth']}
+
+
+def _auth_breaker_gauge() -> dict:
+    current = auth_client.breaker.state
+    return {(state,): int(state == current) for state in (CLOSED, HALF_OPEN, OPEN)}
+
+
+REGISTRY.register(Gauge('db_pool_connections', 'Соединения пула бд', _db_pool_gauge, ('state',)))
+REGISTRY.register(Gauge('password_hasher_tasks', 'Задачи пула хэширования паролей', _password_hasher_gauge, ('state',)))
+REGISTRY.register(Gauge('audit_queue_depth', 'Записи аудита, ожидающие записи в бд', _audit_queue_gauge))
+REGISTRY.register(Gauge('auth_circuit_state', 'Состояние circuit breaker клиента auth', _auth_breaker_gauge, ('state',)))
+
+
+@router.get('/metrics', include_in_schema=False)
+async def metrics() -> PlainTextResponse:
+    """Метрики процесса в текстовом формате Prometheus"""
+    return PlainTextResponse(REGISTRY.render(), media_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,74 @@
+from fastapi import APIRouter, status
+
+from app.api.routes.dependencies import token_cache, token_verifications
+from app.api.utils.admission import admission_controller
+from app.api.utils.auth_client import auth_client
+from app.api.utils.hashing import password_hasher, password_history_checker
+from app.db import get_pool_stats
+from app.db.audit import audit_writer
+from app.db.functions import user_lookups
+from app.db.password_rehash import password_rehasher
+from app.db.user_cache import user_cache
+from app.db.verification import verification_store
+
+router = APIRouter(
+    prefix='/service'
+)
+
+
+@router.get('/db_pool', status_code=status.HTTP_200_OK)
+async def db_pool_stats() -> dict:
+    """Эндпоинт со статистикой пула соединений с бд"""
+    return get_pool_stats()
+
+
+@router.get('/password_hasher', status_code=status.HTTP_200_OK)
+async def password_hasher_stats() -> dict:
+    """Эндпоинт со статистикой пула хэширования паролей"""
+    return {
+        **password_hasher.stats(),
+        'password_history': password_history_checker.stats(),
+        'rehash': password_rehasher.stats(),
+    }
+
+
+@router.get('/caches', status_code=status.HTTP_200_OK)
+async def caches_stats() -> dict:
+    """Эндпоинт со статистикой in-process кэшей"""
+    return {
+        'token': token_cache.stats(),
+        'user': user_cache.stats(),
+    }
+
+
+@router.get('/audit', status_code=status.HTTP_200_OK)
+async def audit_stats() -> dict:
+    """Эндпоинт со статистикой очереди аудита запросов"""
+    return audit_writer.stats()
+
+
+@router.get('/admission', status_code=status.HTTP_200_OK)
+async def admission_stats() -> dict:
+    """Эндпоинт со статистикой допуска запросов с хэшированием паролей"""
+    return admission_controller.stats()
+
+
+@router.get('/verification', status_code=status.HTTP_200_OK)
+async def verification_stats() -> dict:
+    """Эндпоинт со статистикой проверки кодов подтверждения"""
+    return verification_store.stats()
+
+
+@router.get('/singleflight', status_code=status.HTTP_200_OK)
+async def singleflight_stats() -> dict:
+    """Эндпоинт со статистикой объединения одновременных одинаковых вызовов"""
+    return {
+        flight.name: flight.stats()
+        for flight in (user_lookups, token_verifications)
+    }
+
+
+@router.get('/auth_client', status_code=status.HTTP_200_OK)
+async def auth_client_stats() -> dict:
+    """Эндпоинт с состоянием circuit breaker клиента сервиса auth"""
+    return auth_client.stats()
@@ -1,32 +1,57 @@
 import asyncpg
-import bcrypt
 import httpx
-import redis
-import requests
+from redis import asyncio as aioredis
+from typing import AsyncIterator, Optional
 from uuid import UUID
-from fastapi import APIRouter, Depends, Request, HTTPException, status, Body
-from app.db.functions import execute_get_all_users, execute_get_user_by_id, execute_delete_user
-from app.db.procedures import execute_create_user, execute_update_user
-from app.db import get_db
-from app.api.utils.pass_utils import hash_password, verify_password_reset_token
+from fastapi import APIRouter, Depends, Request, HTTPException, Query, status, Body
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from app.db.functions import (
+    execute_delete_user, execute_get_password_history,
+    execute_get_users_page, execute_get_users_by_ids, iterate_users,
+    execute_get_user_id_by_email, execute_mark_user_verified, execute_insert_password
+)
+from app.db import acquire_connection, get_db
+from app.db.bulk_import import import_users, iter_lines, iter_rows
+from app.db.password_rehash import password_rehasher
+from app.db.redis_client import get_redis
+from app.db.user_cache import get_user_cached, invalidate_user
+from app.db.verification import CODE_INVALID, CODE_LOCKED, CODE_VALID, verification_store
+from app.api.utils.admission import admission_controller
+from app.api.utils.auth_client import AuthServiceUnavailable, auth_client
+from app.api.utils.responses import FastJSONResponse, encode_user, encode_user_line, encode_users_page
+from app.api.utils.hashing import password_hasher, password_history_checker
+from app.api.utils.pass_utils import verify_password_reset_token
+from app.middlewares.request_info import set_request_info
 from app.api.routes.dependencies import get_current_user, token_required, handle_user_creation, handle_user_update
 from app.core.config import settings
-from app.schemas.users import UserCreate, UserCreateResponse, UserUpdate, GetAllUsersListResponse, GetUserResponse
+from app.schemas.users import (
+    UserCreate, UserCreateResponse, UserUpdate, GetAllUsersListResponse, GetUserResponse,
+    BatchGetUsersRequest, BatchGetUsersResponse
+)
 import logging
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(
-    prefix=f'/api/v1/{settings.service_name}'
+    prefix=f'/api/v1/{settings.service_name}',
+    dependencies=[Depends(set_request_info)]
 )
 
-redis = redis.from_url(f"redis://{settings.redis_host}:{settings.redis_port}", decode_responses=True)
-
 @router.post('', status_code=status.HTTP_201_CREATED, response_model=UserCreateResponse)
-async def create_user(user: UserCreate, conn: asyncpg.Connection = Depends(get_db)) -> UserCreateResponse:
+async def create_user(
+    user: UserCreate,
+    request: Request,
+    conn: asyncpg.Connection = Depends(get_db),
+    redis: aioredis.Redis = Depends(get_redis)
+) -> UserCreateResponse:
+    # без сервиса auth пользователь не получит токены, поэтому отказ до хэширования пароля
+    auth_client.ensure_available()
     try:
-        user_response = await handle_user_creation(conn, user)
-        auth_response = requests.post(f'{settings.auth_service_url}/login', json={"user_id": str(user_response.id)})
+        async with admission_controller.admit(redis, 'create_user', request.state.real_ip, user.email):
+            user_response = await handle_user_creation(conn, user)
+        auth_response = await auth_client.login(str(user_response.id))
         if auth_response.status_code != 200:
             raise HTTPException(status_code=500, detail="Failed to create tokens in auth service")
         
@@ -42,37 +67,139 @@ async def create_user(user: UserCreate, conn: asyncpg.Connection = Depends(get_d
             token_type=token_data['token_type']
         )
 
+    except (HTTPException, AuthServiceUnavailable):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def stream_users_ndjson(
+    cursor: Optional[UUID],
+    role: Optional[str],
+    is_verified: Optional[bool]
+) -> AsyncIterator[bytes]:
+    """Потоковая выдача пользователей в формате NDJSON через серверный курсор"""
+    async with acquire_connection() as conn:
+        async with conn.transaction(readonly=True):
+            async for record in iterate_users(
+                conn, after=cursor, role=role, is_verified=is_verified,
+                prefetch=settings.users_stream_prefetch
+            ):
+                yield encode_user_line(record)
+
+@router.get('', status_code=status.HTTP_200_OK, response_model=GetAllUsersListResponse)
+@token_required
+async def get_users(
+    request: Request,
+    cursor: Optional[UUID] = Query(default=None, description='id последнего пользователя предыдущей страницы'),
+    limit: int = Query(default=settings.users_page_default_limit, ge=1, le=settings.users_page_max_limit),
+    role: Optional[str] = None,
+    is_verified: Optional[bool] = None,
+    stream: bool = Query(default=False, description='потоковая выдача всех пользователей в NDJSON'),
+    current_user: UUID = Depends(get_current_user)
+):
+    """Эндпоинт для получения списка пользователей с keyset-пагинацией"""
+    if stream:
+        return StreamingResponse(
+            stream_users_ndjson(cursor, role, is_verified),
+            media_type='application/x-ndjson'
+        )
+    async with acquire_connection() as conn:
+        users = await execute_get_users_page(conn, limit, after=cursor, role=role, is_verified=is_verified)
+    next_cursor = users[-1]['id'] if len(users) == limit else None
+    if settings.fast_json_responses:
+        return FastJSONResponse(encode_users_page(users, next_cursor))
+    return GetAllUsersListResponse(
+        users=[GetUserResponse(**user) for user in users],
+        next_cursor=next_cursor
+    )
+
+@router.post('/batch_get', status_code=status.HTTP_200_OK, response_model=BatchGetUsersResponse)
+@token_required
+async def batch_get_users(
+    request: Request,
+    batch: BatchGetUsersRequest,
+    conn: asyncpg.Connection = Depends(get_db),
+    current_user: UUID = Depends(get_current_user)
+) -> BatchGetUsersResponse:
+    """Эндпоинт для получения нескольких пользователей одним запросом к бд"""
+    user_ids = list(dict.fromkeys(batch.ids))
+    users = await execute_get_users_by_ids(conn, user_ids)
+    if settings.fast_json_responses:
+        found_ids = {user['id'] for user in users}
+        return FastJSONResponse({
+            'users': {user['id']: encode_user(user) for user in users},
+            'missing': [user_id for user_id in user_ids if user_id not in found_ids]
+        })
+    found = {user['id']: GetUserResponse(**user) for user in users}
+    return BatchGetUsersResponse(
+        users=found,
+        missing=[user_id for user_id in user_ids if user_id not in found]
+    )
+
+@router.post('/import', status_code=status.HTTP_200_OK)
+async def bulk_import_users(
+    request: Request,
+    format: Optional[str] = Query(default=None, pattern='^(csv|ndjson)$', description='формат тела: csv или ndjson'),
+    conn: asyncpg.Connection = Depends(get_db),
+    redis: aioredis.Redis = Depends(get_redis),
+    current_user: UUID = Depends(get_current_user)
+) -> dict:
+    """Эндпоинт для массового импорта пользователей из CSV или NDJSON в теле запроса (только для администраторов)"""
+    user = await get_user_cached(conn, redis, UUID(str(current_user)))
+    if not user or user['role'] != settings.bulk_import_role:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='Недостаточно прав для импорта')
+    if format is None:
+        content_type = request.headers.get('content-type', '')
+        format = 'csv' if 'csv' in content_type else 'ndjson'
+    rows = iter_rows(iter_lines(request.stream()), format)
+    async with admission_controller.admit(redis, 'bulk_import', request.state.real_ip, str(current_user)):
+        # импорт через API не должен занимать пул хэширования, общий с обычными запросами
+        return await import_users(conn, rows, hash_concurrency=settings.bulk_import_hash_concurrency)
+
 @router.get('/{user_id}', status_code=status.HTTP_200_OK, response_model=GetUserResponse)
 @token_required
 async def get_user(user_id: UUID, request: Request, conn: asyncpg.Connection = Depends(get_db),
+redis: aioredis.Redis = Depends(get_redis),
 current_user: UUID = Depends(get_current_user),
 )  -> GetUserResponse:
-    user = await execute_get_user_by_id(conn, user_id)
+    user = await get_user_cached(conn, redis, user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='User not found')
+    if settings.fast_json_responses:
+        return FastJSONResponse(encode_user(user))
     return GetUserResponse(**user)
 
 @router.patch('/{user_id}', status_code=status.HTTP_200_OK)
 @token_required
-async def update_user(user_id: UUID, request: Request, conn: asyncpg.Connection = Depends(get_db)) -> dict:
-    user_data = await request.json()
+async def update_user(user_id: UUID, request: Request, conn: asyncpg.Connection = Depends(get_db),
+redis: aioredis.Redis = Depends(get_redis)) -> dict:
+    # тело читается вручную, так как token_required ищет в нем refresh_token
     try:
-        updated_user = await handle_user_update(conn, user_id, user_data)
+        user_update = UserUpdate.model_validate(await request.json())
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+    try:
+        if user_update.hashed_pass:
+            async with admission_controller.admit(redis, 'update_user', request.state.real_ip, str(user_id)):
+                updated_user = await handle_user_update(conn, redis, user_id, user_update)
+        else:
+            updated_user = await handle_user_update(conn, redis, user_id, user_update)
         return updated_user
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))  
 
 @router.delete('/{user_id}', status_code=status.HTTP_204_NO_CONTENT)
 @token_required
 async def delete_user(user_id: UUID, request: Request, conn: asyncpg.Connection = Depends(get_db),
+redis: aioredis.Redis = Depends(get_redis),
 current_user: UUID = Depends(get_current_user)) -> None:
     try:
         await execute_delete_user(conn, user_id)
     except HTTPException:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    await invalidate_user(redis, user_id)
 
 
 @router.post('/verify_code/{user_id}/', status_code=status.HTTP_200_OK)
@@ -82,44 +209,55 @@ async def verify_code(
     request: Request,
     verification_code: str, 
     conn: asyncpg.Connection = Depends(get_db),
+    redis: aioredis.Redis = Depends(get_redis),
     current_user: UUID = Depends(get_current_user)
 ) -> dict:
     """
     Эндпоинт для верификации 6-значного кода, отправленного на почту.
+    Код проверяется и удаляется одним атомарным вызовом Redis, число неудачных попыток ограничено.
     """
-    user = await conn.fetchrow('SELECT email FROM users WHERE id = $1', user_id)
+    user = await get_user_cached(conn, redis, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, 
             detail="Пользователь не найден"
         )
-    email = user['email']
-
-    # Получаем код из Redis по ключу email
-    redis_key = f"verification_code:{email}"
-    stored_code = redis.get(redis_key)  # Use synchronous get
-
-    if stored_code == verification_code:
-        await conn.execute('UPDATE users SET is_verified = TRUE WHERE id = $1', user_id)
-
-        redis.delete(redis_key)
 
-        return {"message": "Email успешно подтвержден", "is_verified": True}
-    else:
+    email = user['email']
+    result, remaining = await verification_store.check_and_consume(redis, email, verification_code)
+    if result == CODE_LOCKED:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Превышено число попыток, запросите новый код"
+        )
+    if result != CODE_VALID:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Коды верификации не совпадают "
+            detail=f"Коды верификации не совпадают ",
+            headers={'X-Attempts-Remaining': str(remaining)} if result == CODE_INVALID else None
         )
 
+    # email в условии защищает от подтверждения адреса, измененного после чтения из кэша
+    if not await execute_mark_user_verified(conn, user_id, email):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Пользователь не найден"
+        )
+    await invalidate_user(redis, user_id)
+
+    return {"message": "Email успешно подтвержден", "is_verified": True}
+
 
 @router.post('/reset_password', status_code=status.HTTP_200_OK)
 async def reset_password(
+    request: Request,
     email: str = Body(...), 
     new_password: str = Body(...),
-    conn: asyncpg.Connection = Depends(get_db)
+    conn: asyncpg.Connection = Depends(get_db),
+    redis: aioredis.Redis = Depends(get_redis)
 ):
     """Эндпоинт для установки нового пароля после сброса."""
-    stored_token = redis.get(f"password_reset_token:{email}")
+    stored_token = await redis.get(f"password_reset_token:{email}")
     
     if not stored_token:
         raise HTTPException(status_code=400, detail="Invalid or expired token")
@@ -129,33 +267,20 @@ async def reset_password(
     except HTTPException:
         raise HTTPException(status_code=400, detail="Invalid token")
 
-    hashed_password = hash_password(new_password)
-    
-    previous_passwords = await conn.fetch(
-        """
-        SELECT hashed_pass, created_at
-        FROM passwords
-        WHERE user_id = $1
-        """,
-        user_id
-    )
-    for record in previous_passwords:
-        old_hashed_password = record['hashed_pass']
-        created_at = record['created_at']
-
-        if bcrypt.checkpw(new_password.encode('utf-8'), old_hashed_password.encode('utf-8')):
+    async with admission_controller.admit(redis, 'reset_password', request.state.real_ip, email):
+        previous_passwords = await execute_get_password_history(conn, user_id, password_history_checker.max_depth)
+        matched = await password_history_checker.find_match(new_password, previous_passwords)
+        if matched is not None:
+            if matched is previous_passwords[0]:
+                # пароль подтвержден по текущему хэшу: устаревшая стоимость bcrypt обновляется в фоне
+                password_rehasher.schedule(user_id, new_password, matched['hashed_pass'])
             raise HTTPException(
                 status_code=400,
-                detail=f"Данный пароль уже создавался {created_at.strftime('%Y-%m-%d %H:%M:%S')}. Пожалуйста, введите другой пароль."
+                detail=f"Данный пароль уже создавался {matched['created_at'].strftime('%Y-%m-%d %H:%M:%S')}. Пожалуйста, введите другой пароль."
             )
 
-    await conn.execute(
-        """
-        INSERT INTO passwords (user_id, hashed_pass, created_at)
-        VALUES ($1, $2, NOW())
-        """,
-        user_id, hashed_password
-    )
+        hashed_password = await password_hasher.hash(new_password)
+    await execute_insert_password(conn, user_id, hashed_password)
 
     return {"message": "Пароль успешно изменен"}
 
@@ -167,17 +292,14 @@ async def request_password_reset(
     """
     Эндпоинт для проверки существования email в users и запроса сброса пароля в auth.
     """
-    user = await conn.fetchrow("SELECT id FROM users WHERE email = $1", email)
+    user_id = await execute_get_user_id_by_email(conn, email)
     
-    if not user:
+    if not user_id:
         return {"message": "Данный email не зарегистрирован"}
 
-    auth_url = f"{settings.auth_service_url}/send_password_reset_link?email={email}"
-
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(auth_url)
-            response.raise_for_status()
+        response = await auth_client.send_password_reset_link(email)
+        response.raise_for_status()
 
     except httpx.HTTPStatusError as e:
         raise HTTPException(
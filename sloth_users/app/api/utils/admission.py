@@ -0,0 +1,105 @@
+import logging
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.metrics import ADMISSION_REJECTIONS
+from app.db.redis_scripts import TOKEN_BUCKET
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionController:
+    """Допуск запросов с хэшированием паролей: локальный лимит одновременных запросов
+    и token bucket в Redis по IP, email (или пользователю) и общий.
+    Отказ - 429 с Retry-After до начала работы bcrypt"""
+
+    def __init__(self, max_pending: int = 64, prefix: str = 'admission') -> None:
+        self.max_pending = max_pending
+        self.prefix = prefix
+        self._pending = 0
+        self._admitted = 0
+        self._rejected_local = 0
+        self._rejected_rate = 0
+        self._redis_errors = 0
+
+    def _buckets(self, ip: Optional[str], subject: Optional[str]) -> Tuple[List[str], List[float]]:
+        keys = [f'{self.prefix}:global']
+        args: List[float] = [settings.admission_global_rate, settings.admission_global_burst]
+        if ip:
+            keys.append(f'{self.prefix}:ip:{ip}')
+            args += [settings.admission_ip_rate, settings.admission_ip_burst]
+        if subject:
+            keys.append(f'{self.prefix}:subject:{subject.lower()}')
+            args += [settings.admission_subject_rate, settings.admission_subject_burst]
+        return keys, args
+
+    async def check_rate(self, redis: aioredis.Redis, ip: Optional[str], subject: Optional[str]) -> float:
+        """Списание токена из всех корзин; возвращает время ожидания (0 - запрос допущен).
+        При недоступности Redis запрос допускается"""
+        keys, args = self._buckets(ip, subject)
+        try:
+            wait = await TOKEN_BUCKET(redis, keys, [time.time(), 1, *args])
+        except RedisError as e:
+            self._redis_errors += 1
+            logger.warning('Ограничение частоты недоступно, запрос допущен: %s', e)
+            return 0.0
+        return float(wait)
+
+    def _reject(self, endpoint: str, reason: str, retry_after: float) -> HTTPException:
+        ADMISSION_REJECTIONS.inc(endpoint, reason)
+        return HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail='Слишком много запросов, повторите позже',
+            headers={'Retry-After': str(max(1, math.ceil(retry_after)))},
+        )
+
+    @asynccontextmanager
+    async def admit(
+        self,
+        redis: aioredis.Redis,
+        endpoint: str,
+        ip: Optional[str] = None,
+        subject: Optional[str] = None,
+    ) -> AsyncIterator[None]:
+        """Место для CPU-тяжелой работы на время блока или HTTPException 429"""
+        if not settings.admission_enabled:
+            yield
+            return
+        # локальная проверка дешевле обращения к Redis, поэтому выполняется первой
+        if self._pending >= self.max_pending:
+            self._rejected_local += 1
+            raise self._reject(endpoint, 'concurrency', 1)
+        self._pending += 1
+        try:
+            wait = await self.check_rate(redis, ip, subject)
+            if wait > 0:
+                self._rejected_rate += 1
+                raise self._reject(endpoint, 'rate', wait)
+            self._admitted += 1
+            yield
+        finally:
+            self._pending -= 1
+
+    def stats(self) -> dict:
+        return {
+            'enabled': settings.admission_enabled,
+            'max_pending': self.max_pending,
+            'pending': self._pending,
+            'admitted': self._admitted,
+            'rejected_concurrency': self._rejected_local,
+            'rejected_rate': self._rejected_rate,
+            'redis_errors': self._redis_errors,
+        }
+
+
+admission_controller = AdmissionController(
+    max_pending=settings.admission_max_pending,
+    prefix=settings.admission_prefix,
+)
@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import math
+import time
+from typing import Any, Optional
+
+import httpx
+from fastapi import Request, status
+from fastapi.responses import JSONResponse
+
+from app.api.utils.circuit_breaker import OPEN, CircuitBreaker
+from app.core import deadline
+from app.core.config import settings
+from app.core.metrics import AUTH_CALL_LATENCY
+
+logger = logging.getLogger(__name__)
+
+
+class AuthServiceUnavailable(httpx.RequestError):
+    """Обращение к сервису auth не выполнялось: circuit breaker разомкнут или исчерпан бюджет запроса"""
+
+    def __init__(self, message: str, status_code: int, retry_after: float = 0.0) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+async def auth_unavailable_handler(request: Request, exc: AuthServiceUnavailable) -> JSONResponse:
+    """Быстрый отказ без ожидания сервиса auth"""
+    headers = {'Retry-After': str(max(1, math.ceil(exc.retry_after)))} if exc.retry_after else None
+    return JSONResponse(status_code=exc.status_code, content={'detail': str(exc)}, headers=headers)
+
+
+class AuthServiceClient:
+    """Общий HTTP-клиент сервиса auth с пулом keep-alive соединений"""
+
+    def __init__(
+        self,
+        base_url: str,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        timeout: float = 5.0,
+        connect_timeout: float = 2.0,
+        http2: bool = False,
+        min_call_timeout: float = 0.05,
+        breaker: Optional[CircuitBreaker] = None,
+    ) -> None:
+        self.base_url = base_url.rstrip('/')
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.call_timeout = timeout
+        self.min_call_timeout = min_call_timeout
+        self.breaker = breaker or CircuitBreaker('auth')
+        self.http2 = http2
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def start(self, transport: Optional[httpx.AsyncBaseTransport] = None) -> None:
+        """Создание клиента; transport позволяет подменить сеть (например, ASGI-приложением в бенчмарках)"""
+        if self._client is not None:
+            return
+        http2 = self.http2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning('HTTP/2 для клиента auth недоступен: пакет h2 не установлен')
+                http2 = False
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            limits=self.limits,
+            timeout=self.timeout,
+            http2=http2,
+            transport=transport,
+        )
+
+    async def close(self) -> None:
+        if self._client is None:
+            return
+        await self._client.aclose()
+        self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self.start()
+        return self._client
+
+    def ensure_available(self) -> None:
+        """Быстрый отказ до начала работы, которой нужен сервис auth"""
+        if self.breaker.state == OPEN:
+            raise AuthServiceUnavailable(
+                'Auth service is unavailable', status.HTTP_503_SERVICE_UNAVAILABLE, self.breaker.retry_after()
+            )
+
+    def _deadline(self) -> float:
+        """Дедлайн вызова: таймаут клиента, ограниченный остатком бюджета текущего запроса"""
+        remaining = deadline.remaining()
+        if remaining is None:
+            return self.call_timeout
+        if remaining < self.min_call_timeout:
+            raise AuthServiceUnavailable('Request deadline exceeded', status.HTTP_504_GATEWAY_TIMEOUT)
+        return min(self.call_timeout, remaining)
+
+    async def _post(self, endpoint: str, **kwargs: Any) -> httpx.Response:
+        """POST в сервис auth с дедлайном из бюджета запроса, через circuit breaker
+        и с учетом длительности и исхода вызова"""
+        timeout = self._deadline()
+        generation = self.breaker.allow()
+        if generation is None:
+            raise AuthServiceUnavailable(
+                'Auth service is unavailable', status.HTTP_503_SERVICE_UNAVAILABLE, self.breaker.retry_after()
+            )
+        started = time.perf_counter()
+        outcome = 'error'
+        success = None
+        try:
+            try:
+                response = await asyncio.wait_for(self.client.post(endpoint, **kwargs), timeout)
+            except asyncio.TimeoutError:
+                outcome = 'timeout'
+                raise httpx.TimeoutException(f'Auth service call exceeded {timeout:.3f}s deadline')
+            outcome = str(response.status_code)
+            success = response.status_code < 500
+            return response
+        except httpx.RequestError:
+            success = False
+            raise
+        finally:
+            self.breaker.record(success, generation)
+            AUTH_CALL_LATENCY.observe(time.perf_counter() - started, endpoint, outcome)
+
+    def stats(self) -> dict:
+        return {
+            'call_timeout': self.call_timeout,
+            'breaker': self.breaker.stats(),
+        }
+
+    async def verify_token(self, token: str) -> httpx.Response:
+        return await self._post('/verify_token', json={'token': token})
+
+    async def refresh_token(self, refresh_token: str, access_token: Optional[str] = None) -> httpx.Response:
+        headers = {'Authorization': f'Bearer {access_token}'} if access_token else None
+        return await self._post('/refresh_token', json={'refresh_token': refresh_token}, headers=headers)
+
+    async def login(self, user_id: str) -> httpx.Response:
+        return await self._post('/login', json={'user_id': user_id})
+
+    async def send_password_reset_link(self, email: str) -> httpx.Response:
+        return await self._post('/send_password_reset_link', params={'email': email})
+
+
+auth_client = AuthServiceClient(
+    base_url=settings.auth_service_url,
+    max_connections=settings.auth_client_max_connections,
+    max_keepalive_connections=settings.auth_client_max_keepalive_connections,
+    keepalive_expiry=settings.auth_client_keepalive_expiry,
+    timeout=settings.auth_client_timeout,
+    connect_timeout=settings.auth_client_connect_timeout,
+    http2=settings.auth_client_http2,
+    min_call_timeout=settings.auth_client_min_call_timeout,
+    breaker=CircuitBreaker(
+        'auth',
+        failure_threshold=settings.auth_breaker_failure_threshold,
+        reset_timeout=settings.auth_breaker_reset_timeout,
+        half_open_max_calls=settings.auth_breaker_half_open_max_calls,
+    ),
+)
@@ -0,0 +1,85 @@
+"""Подбор стоимости bcrypt под целевое время хэширования на текущей машине.
+
+Измеряет время хэширования для каждой стоимости начиная с --min-rounds и выбирает наибольшую,
+при которой медианное время не превышает цель. С --env-file записывает BCRYPT_ROUNDS в файл настроек.
+Хэши с другой стоимостью обновляются при следующей успешной проверке пароля.
+
+Запуск: python -m app.api.utils.bcrypt_calibration --target-ms 250 --env-file .env
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+from typing import Dict, Optional, Tuple
+
+from passlib.hash import bcrypt
+
+from app.core.config import settings
+
+MIN_ROUNDS = 10
+MAX_ROUNDS = 16
+
+
+def measure(rounds: int, samples: int = 3) -> float:
+    """Медианное время одного хэширования в секундах"""
+    hasher = bcrypt.using(rounds=rounds)
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        hasher.hash('bcrypt-calibration')
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def calibrate(
+    target_ms: float,
+    min_rounds: int = MIN_ROUNDS,
+    max_rounds: int = MAX_ROUNDS,
+    samples: int = 3,
+) -> Tuple[int, Dict[int, float]]:
+    """Наибольшая стоимость с временем хэширования не больше target_ms (но не меньше min_rounds)
+    и измеренные времена в миллисекундах по стоимости"""
+    timings: Dict[int, float] = {}
+    chosen = min_rounds
+    for rounds in range(min_rounds, max_rounds + 1):
+        elapsed_ms = measure(rounds, samples) * 1000
+        timings[rounds] = round(elapsed_ms, 1)
+        if elapsed_ms > target_ms:
+            break
+        chosen = rounds
+    return chosen, timings
+
+
+def write_env(path: str, rounds: int) -> None:
+    """Замена или добавление BCRYPT_ROUNDS в файле настроек"""
+    lines = []
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as file:
+            lines = [line for line in file.read().splitlines() if not line.startswith('BCRYPT_ROUNDS=')]
+    lines.append(f'BCRYPT_ROUNDS={rounds}')
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write('\n'.join(lines) + '\n')
+
+
+def main(target_ms: float, min_rounds: int, max_rounds: int, samples: int, env_file: Optional[str]) -> None:
+    rounds, timings = calibrate(target_ms, min_rounds, max_rounds, samples)
+    if env_file:
+        write_env(env_file, rounds)
+    print(json.dumps({
+        'target_ms': target_ms,
+        'current_rounds': settings.bcrypt_rounds,
+        'recommended_rounds': rounds,
+        'timings_ms': timings,
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target-ms', type=float, default=settings.bcrypt_target_ms)
+    parser.add_argument('--min-rounds', type=int, default=MIN_ROUNDS)
+    parser.add_argument('--max-rounds', type=int, default=MAX_ROUNDS)
+    parser.add_argument('--samples', type=int, default=3)
+    parser.add_argument('--env-file', help='файл настроек для записи BCRYPT_ROUNDS')
+    args = parser.parse_args()
+    main(args.target_ms, args.min_rounds, args.max_rounds, args.samples, args.env_file)
@@ -0,0 +1,94 @@
+import time
+from typing import Optional
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """Circuit breaker для обращений к внешнему сервису.
+
+    После failure_threshold ошибок подряд размыкается: вызовы сразу отклоняются в течение reset_timeout.
+    Затем переходит в half-open и пропускает до half_open_max_calls пробных вызовов: успех замыкает его,
+    ошибка снова размыкает. Каждое размыкание начинает новое поколение; исходы вызовов, разрешенных
+    в предыдущих поколениях, не меняют состояние (поздний успех не замыкает только что разомкнутый breaker)"""
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 10.0,
+        half_open_max_calls: int = 1,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._generation = 0
+        self._rejected = 0
+        self._opened = 0
+        self._stale = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = HALF_OPEN
+            self._probes = 0
+        return self._state
+
+    def retry_after(self) -> float:
+        """Время до следующего пробного вызова в секундах"""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def allow(self) -> Optional[int]:
+        """Разрешение на вызов: поколение, в котором он разрешен, или None, если вызов отклонен.
+        В half-open занимает место пробного вызова"""
+        state = self.state
+        if state == CLOSED:
+            return self._generation
+        if state == HALF_OPEN and self._probes < self.half_open_max_calls:
+            self._probes += 1
+            return self._generation
+        self._rejected += 1
+        return None
+
+    def record(self, success: Optional[bool], generation: int) -> None:
+        """Учет исхода вызова, разрешенного в поколении generation; None - вызов прерван без результата"""
+        if generation != self._generation:
+            self._stale += 1
+            return
+        if self._state == HALF_OPEN:
+            self._probes = max(0, self._probes - 1)
+        if success is None:
+            return
+        if success:
+            self._failures = 0
+            self._state = CLOSED
+            return
+        self._failures += 1
+        if self._state == HALF_OPEN or (self._state == CLOSED and self._failures >= self.failure_threshold):
+            self._open()
+
+    def _open(self) -> None:
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._probes = 0
+        self._generation += 1
+        self._opened += 1
+
+    def stats(self) -> dict:
+        return {
+            'state': self.state,
+            'consecutive_failures': self._failures,
+            'retry_after': round(self.retry_after(), 3),
+            'opened': self._opened,
+            'rejected': self._rejected,
+            'stale_outcomes': self._stale,
+        }
@@ -0,0 +1,189 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Mapping, Optional, Sequence
+
+from app.api.utils.pass_utils import hash_password, verify_password
+from app.core.config import settings
+from app.core.metrics import PASSWORD_HASH_LATENCY
+
+
+def _process_context() -> multiprocessing.context.BaseContext:
+    """Контекст процессов пула хэширования. fork из процесса с потоками (логирование, пулы) может
+    унаследовать захваченные блокировки, поэтому процессы создаются через forkserver (или spawn, где его нет);
+    в сервер forkserver заранее загружается только модуль с функциями хэширования"""
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('spawn')
+    context = multiprocessing.get_context('forkserver')
+    context.set_forkserver_preload(['app.api.utils.pass_utils'])
+    return context
+
+
+def _call_in_loop(loop: asyncio.AbstractEventLoop, callback: Callable[[], None]) -> None:
+    """Вызов callback в цикле событий из потока пула; после закрытия цикла вызов пропускается"""
+    try:
+        loop.call_soon_threadsafe(callback)
+    except RuntimeError:
+        pass
+
+
+class PasswordHasher:
+    """Асинхронный сервис хэширования паролей в отдельном пуле процессов или потоков"""
+
+    def __init__(
+        self,
+        executor_kind: str = 'process',
+        max_workers: Optional[int] = None,
+        max_concurrency: int = 16,
+    ) -> None:
+        if executor_kind not in ('process', 'thread'):
+            raise ValueError("executor_kind must be 'process' or 'thread'")
+        self.executor_kind = executor_kind
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_concurrency = max_concurrency
+        self._executor: Optional[Executor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._waiting = 0
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+
+    def start(self) -> None:
+        if self._executor is not None:
+            return
+        if self.executor_kind == 'process':
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=_process_context())
+        else:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix='password-hasher',
+            )
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    def shutdown(self) -> None:
+        if self._executor is None:
+            return
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._executor = None
+        self._semaphore = None
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Выполнение функции в пуле с ограничением числа одновременных задач"""
+        if self._executor is None:
+            self.start()
+        loop = asyncio.get_running_loop()
+        self._waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+        self._running += 1
+        semaphore = self._semaphore
+        started = time.perf_counter()
+
+        def release() -> None:
+            self._running -= 1
+            semaphore.release()
+            PASSWORD_HASH_LATENCY.observe(time.perf_counter() - started, func.__name__)
+
+        try:
+            future = self._executor.submit(func, *args)
+        except BaseException:
+            release()
+            raise
+        # слот освобождается, когда задача завершилась в пуле, а не когда ожидающий вызов отменен:
+        # отмененное хэширование продолжает занимать процесс пула до конца
+        future.add_done_callback(lambda _: _call_in_loop(loop, release))
+        try:
+            result = await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self._failed += 1
+            raise
+        self._completed += 1
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self.run(hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self.run(verify_password, plain_password, hashed_password)
+
+    def stats(self) -> dict:
+        return {
+            'executor': self.executor_kind,
+            'bcrypt_rounds': settings.bcrypt_rounds,
+            'max_workers': self.max_workers,
+            'max_concurrency': self.max_concurrency,
+            'queue_depth': self._waiting,
+            'in_flight': self._running,
+            'completed': self._completed,
+            'failed': self._failed,
+        }
+
+
+class PasswordHistoryChecker:
+    """Параллельная проверка нового пароля по истории ранее использованных хэшей.
+    Одновременно в одном запросе выполняется не больше max_parallel проверок, начиная с новых записей"""
+
+    def __init__(self, hasher: PasswordHasher, max_depth: int = 10, max_parallel: int = 2) -> None:
+        self.hasher = hasher
+        self.max_depth = max_depth
+        self.max_parallel = max_parallel
+        self._checks = 0
+        self._matches = 0
+        self._total_seconds = 0.0
+        self._max_seconds = 0.0
+
+    async def find_match(self, password: str, history: Sequence[Mapping]) -> Optional[Mapping]:
+        """Возвращает первую найденную запись истории с совпадающим хэшем или None"""
+        started = time.perf_counter()
+        slots = asyncio.Semaphore(self.max_parallel)
+
+        async def check(record: Mapping) -> Optional[Mapping]:
+            async with slots:
+                return record if await self.hasher.verify(password, record['hashed_pass']) else None
+
+        tasks = [asyncio.ensure_future(check(record)) for record in list(history)[:self.max_depth]]
+        match = None
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                match = await next_done
+                if match is not None:
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+            elapsed = time.perf_counter() - started
+            self._checks += 1
+            self._total_seconds += elapsed
+            self._max_seconds = max(self._max_seconds, elapsed)
+        if match is not None:
+            self._matches += 1
+        return match
+
+    def stats(self) -> dict:
+        return {
+            'max_depth': self.max_depth,
+            'max_parallel': self.max_parallel,
+            'checks': self._checks,
+            'matches': self._matches,
+            'avg_seconds': self._total_seconds / self._checks if self._checks else 0.0,
+            'max_seconds': self._max_seconds,
+        }
+
+
+password_hasher = PasswordHasher(
+    executor_kind=settings.password_hasher_executor,
+    max_workers=settings.password_hasher_max_workers,
+    max_concurrency=settings.password_hasher_max_concurrency,
+)
+
+password_history_checker = PasswordHistoryChecker(
+    hasher=password_hasher,
+    max_depth=settings.password_history_depth,
+    max_parallel=settings.password_history_parallelism,
+)
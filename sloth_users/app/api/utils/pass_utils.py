@@ -1,12 +1,20 @@
 import jwt
 
 from datetime import datetime, timedelta
+from fastapi import HTTPException
 from uuid import UUID
 from passlib.context import CryptContext
 
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
+# хэши с любой другой стоимостью считаются устаревшими (needs_update)
+pwd_context = CryptContext(
+    schemes=['bcrypt'],
+    deprecated='auto',
+    bcrypt__rounds=settings.bcrypt_rounds,
+    bcrypt__min_rounds=settings.bcrypt_rounds,
+    bcrypt__max_rounds=settings.bcrypt_rounds,
+)
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
@@ -16,6 +24,10 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def needs_update(hashed_password: str) -> bool:
+    return pwd_context.needs_update(hashed_password)
+
+
 def verify_password_reset_token(token: str) -> UUID:
     try:
         payload = jwt.decode(token, settings.jwt_secret_key, algorithms=["HS256"])
@@ -0,0 +1,37 @@
+from typing import Any, Iterable, Mapping, Optional
+
+from fastapi.responses import JSONResponse
+from pydantic_core import to_json
+
+from app.schemas.users import GetUserResponse
+
+# порядок и состав полей ответа совпадают со схемой GetUserResponse
+USER_RESPONSE_FIELDS = tuple(GetUserResponse.model_fields)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON-ответ, сериализуемый pydantic-core напрямую (UUID, datetime и Decimal без jsonable_encoder)"""
+
+    def render(self, content: Any) -> bytes:
+        return to_json(content)
+
+
+def encode_user(user: Mapping) -> dict:
+    """Проекция записи пользователя на поля ответа без промежуточной pydantic-модели"""
+    data = {field: user.get(field) for field in USER_RESPONSE_FIELDS}
+    # Decimal в ответах GetUserResponse сериализуется строкой
+    if data['rating'] is not None:
+        data['rating'] = str(data['rating'])
+    return data
+
+
+def encode_users_page(users: Iterable[Mapping], next_cursor: Optional[Any] = None) -> dict:
+    return {
+        'users': [encode_user(user) for user in users],
+        'next_cursor': next_cursor,
+    }
+
+
+def encode_user_line(user: Mapping) -> bytes:
+    """Строка NDJSON для потоковой выдачи пользователей"""
+    return to_json(encode_user(user)) + b'\n'
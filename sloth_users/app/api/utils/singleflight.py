@@ -0,0 +1,77 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+from app.core.config import settings
+
+T = TypeVar('T')
+
+
+class _LeaderCancelled(Exception):
+    """Выполнявший работу вызов был отменен, ожидающие выполняют ее сами"""
+
+
+def _consume_exception(future: asyncio.Future) -> None:
+    # исключение без ожидающих не должно попадать в лог как необработанное
+    if not future.cancelled():
+        future.exception()
+
+
+class SingleFlight:
+    """Объединение одновременных одинаковых асинхронных вызовов: пока вызов с ключом выполняется,
+    остальные вызовы с тем же ключом ждут его результат (или исключение) вместо повторной работы.
+
+    Работа выполняется в задаче первого вызова, поэтому fn может использовать его ресурсы
+    (например, соединение с бд). Если первый вызов отменен, ожидающие повторяют работу со своими fn"""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self._executed = 0
+        self._collapsed = 0
+        self._forgotten = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        if not settings.singleflight_enabled:
+            return await fn()
+        while True:
+            future = self._calls.get(key)
+            if future is None:
+                break
+            self._collapsed += 1
+            try:
+                return await asyncio.shield(future)
+            except _LeaderCancelled:
+                self._collapsed -= 1
+
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(_consume_exception)
+        self._calls[key] = future
+        self._executed += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.set_exception(_LeaderCancelled())
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+    def forget(self, key: Hashable) -> None:
+        """Отвязка выполняющегося вызова от ключа: следующие вызовы с этим ключом не присоединяются к нему,
+        а выполняют работу заново. Нужна, когда данные изменились и начатый раньше вызов мог прочитать старые"""
+        if self._calls.pop(key, None) is not None:
+            self._forgotten += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'in_flight': len(self._calls),
+            'executed': self._executed,
+            'collapsed': self._collapsed,
+            'forgotten': self._forgotten,
+        }
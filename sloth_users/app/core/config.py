@@ -1,6 +1,6 @@
 from pydantic import PostgresDsn, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import Any, Optional
+from typing import Any, Dict, Optional
 
 
 class Settings(BaseSettings):
@@ -14,6 +14,24 @@ class Settings(BaseSettings):
     log_level: str = 'info'
     docs_name: str = 'users'
 
+    # настройки сервера uvicorn
+    server_workers: int = 1  # 0 - по числу CPU
+    server_loop: str = 'auto'  # auto, uvloop или asyncio
+    server_http: str = 'auto'  # auto, httptools или h11
+    server_backlog: int = 2048
+    server_keepalive_timeout: int = 5
+    server_limit_concurrency: Optional[int] = None
+    server_limit_max_requests: Optional[int] = None
+
+    # настройки логирования
+    log_json: bool = True
+    log_queue_maxsize: int = 10000
+    # доля сохраняемых записей ниже WARNING по префиксу логгера, например {"uvicorn.access": 0.1}
+    log_sampling: Dict[str, float] = {}
+    # не больше log_rate_limit записей одного шаблона за log_rate_limit_interval секунд, 0 - без ограничения
+    log_rate_limit: int = 0
+    log_rate_limit_interval: float = 60.0
+
     # настройки базы данных
     postgres_host: str
     postgres_username: str
@@ -22,10 +40,22 @@ class Settings(BaseSettings):
     postgres_db_name: str
     postgres_url: Optional[PostgresDsn] = None
 
+    # настройки пула соединений с бд
+    postgres_pool_total_max_size: int = 20  # бюджет соединений на все воркеры сервера
+    postgres_pool_min_size: int = 5
+    postgres_pool_max_size: Optional[int] = None  # на процесс; None - весь бюджет, при запуске воркеров - его доля
+    postgres_pool_acquire_timeout: float = 5.0
+    postgres_pool_max_inactive_lifetime: float = 300.0
+    postgres_command_timeout: Optional[float] = 30.0
 
     #настройки redis
     redis_host: str = 'redis'
     redis_port: int = 6379
+    redis_db: int = 0
+    redis_max_connections: int = 50
+    redis_socket_timeout: float = 2.0
+    redis_socket_connect_timeout: float = 2.0
+    redis_health_check_interval: int = 30
 
     model_config = SettingsConfigDict(
         env_file='.env',
@@ -36,9 +66,109 @@ class Settings(BaseSettings):
     auth_service_host: str = 'auth'
     auth_service_port: int = 8080
     auth_service_url: str = 'http://auth:8080/api/v1/auth'
+    auth_client_max_connections: int = 100
+    auth_client_max_keepalive_connections: int = 20
+    auth_client_keepalive_expiry: float = 30.0
+    auth_client_timeout: float = 5.0
+    auth_client_connect_timeout: float = 2.0
+    auth_client_http2: bool = False
+    # дедлайн обращения к auth - не больше auth_client_timeout и остатка бюджета запроса;
+    # при остатке меньше auth_client_min_call_timeout обращение не выполняется
+    auth_client_min_call_timeout: float = 0.05
+    # circuit breaker клиента auth: размыкание после серии ошибок, пробные вызовы через reset_timeout
+    auth_breaker_failure_threshold: int = 5
+    auth_breaker_reset_timeout: float = 10.0
+    auth_breaker_half_open_max_calls: int = 1
+
+    # бюджет времени на обработку одного запроса в секундах
+    request_budget: float = 10.0
+
+    # настройки кэша проверки токенов
+    token_cache_enabled: bool = True
+    token_cache_ttl: float = 30.0
+    token_cache_maxsize: int = 10000
+
+    # настройки кэша пользователей
+    user_cache_enabled: bool = True
+    user_cache_local_maxsize: int = 10000
+    user_cache_local_ttl: float = 5.0
+    user_cache_redis_ttl: int = 300
+    user_cache_prefix: str = 'user'
+
+    # объединение одновременных одинаковых чтений пользователя и проверок токена
+    singleflight_enabled: bool = True
+
+    # настройки выдачи списка пользователей
+    users_page_default_limit: int = 50
+    users_page_max_limit: int = 500
+    users_stream_prefetch: int = 500
+    users_batch_max_ids: int = 100
+    # прямая сериализация записей бд в JSON, минуя повторную валидацию response_model
+    fast_json_responses: bool = True
+    phone_validation_cache_size: int = 4096
+
+    # настройки массового импорта пользователей
+    bulk_import_chunk_size: int = 1000
+    bulk_import_max_errors: int = 1000
+    # одновременные хэширования паролей импорта через HTTP, чтобы не занимать весь пул хэширования
+    bulk_import_hash_concurrency: int = 2
+    # роль, которой разрешен импорт через HTTP
+    bulk_import_role: str = 'admin'
+
+    # настройки буферизованной записи аудита запросов
+    audit_enabled: bool = True
+    audit_table: str = 'request_logs'
+    audit_queue_maxsize: int = 10000
+    audit_batch_size: int = 500
+    audit_flush_interval: float = 1.0
+    # политика при переполнении очереди: drop_newest или drop_oldest
+    audit_drop_policy: str = 'drop_newest'
 
     # JWT настройки
     jwt_secret_key: str
+    jwt_algorithm: str = 'HS256'
+    # обязательные claim access токена при локальной проверке: aud и type,
+    # чтобы токены сброса пароля, подписанные тем же ключом, не принимались как access
+    jwt_access_audience: str = 'sloth-users'
+    jwt_access_token_type: str = 'access'
+    # режим проверки access токенов: remote - через сервис auth,
+    # local - локально по подписи и сроку, hybrid - локально с fallback на auth
+    token_verification_mode: str = 'remote'
+    token_revocation_check: bool = False
+    token_revocation_prefix: str = 'revoked_token'
+
+    # настройки пула хэширования паролей
+    password_hasher_executor: str = 'process'
+    password_hasher_max_workers: Optional[int] = None
+    password_hasher_max_concurrency: int = 16
+    password_history_depth: int = 10
+    # одновременные проверки истории паролей в одном запросе, чтобы сброс не занимал общий пул хэширования
+    password_history_parallelism: int = 2
+
+    # стоимость bcrypt (log2 числа раундов), подбирается командой python -m app.api.utils.bcrypt_calibration
+    bcrypt_rounds: int = 12
+    bcrypt_target_ms: float = 250.0
+    # замена хэшей с другой стоимостью после успешной проверки пароля
+    bcrypt_rehash_on_verify: bool = True
+    bcrypt_rehash_max_pending: int = 1000
+
+    # коды подтверждения email в Redis
+    verification_code_prefix: str = 'verification_code'
+    verification_attempts_prefix: str = 'verification_attempts'
+    verification_max_attempts: int = 5
+    verification_attempts_ttl: int = 900
+
+    # допуск запросов с хэшированием паролей: token bucket в Redis (скорость в токенах/с и емкость)
+    # по IP из x-real-ip, по email или пользователю и общий, плюс локальный лимит одновременных запросов
+    admission_enabled: bool = True
+    admission_prefix: str = 'admission'
+    admission_ip_rate: float = 1.0
+    admission_ip_burst: int = 10
+    admission_subject_rate: float = 0.1
+    admission_subject_burst: int = 5
+    admission_global_rate: float = 200.0
+    admission_global_burst: int = 400
+    admission_max_pending: int = 64
 
 
     @property
@@ -0,0 +1,23 @@
+import time
+from contextvars import ContextVar, Token
+from typing import Optional
+
+# момент (time.monotonic), к которому должна завершиться обработка текущего запроса
+_deadline: ContextVar[Optional[float]] = ContextVar('request_deadline', default=None)
+
+
+def set_deadline(budget: float) -> Token:
+    """Установка дедлайна текущего запроса через budget секунд"""
+    return _deadline.set(time.monotonic() + budget)
+
+
+def reset_deadline(token: Token) -> None:
+    _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Остаток бюджета текущего запроса в секундах или None вне запроса"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
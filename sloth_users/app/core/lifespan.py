@@ -0,0 +1,30 @@
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator
+
+from app.api.utils.auth_client import auth_client
+from app.api.utils.hashing import password_hasher
+from app.core.config import settings
+from app.db import close_pool, init_pool
+from app.db.audit import audit_writer
+from app.db.password_rehash import password_rehasher
+from app.db.redis_client import close_redis, init_redis
+
+
+@asynccontextmanager
+async def lifespan(app) -> AsyncGenerator:
+    """Контекстный менеджер жизненного цикла приложения: пул бд, Redis, пул хэширования паролей, клиент auth и запись аудита"""
+    await init_pool()
+    await init_redis()
+    password_hasher.start()
+    auth_client.start()
+    if settings.audit_enabled:
+        audit_writer.start()
+    try:
+        yield
+    finally:
+        await audit_writer.stop()
+        await password_rehasher.stop()
+        await auth_client.close()
+        password_hasher.shutdown()
+        await close_redis()
+        await close_pool()
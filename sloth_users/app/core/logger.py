@@ -1,34 +1,230 @@
-from typing import Any
+import atexit
+import json
+import logging
+import queue
+import random
+import re
+import threading
+import time
+from logging.config import dictConfig
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional, Tuple
 
 from app.core.config import settings
 
+# ключи, значения которых не должны попадать в логи
+SECRET_KEYS = (
+    'password', 'new_password', 'hashed_pass', 'token', 'access_token', 'refresh_token',
+    'secret', 'authorization', 'cookie', 'code',
+)
+REDACTED = '***'
+
+
+def _mask_value(value: str) -> str:
+    """Маска значения с сохранением кавычек"""
+    if value[:1] in ('"', "'"):
+        return value[0] + REDACTED + value[0]
+    return REDACTED
+
+
+_SECRET_PATTERNS = (
+    # bearer раньше ключей: иначе ключ authorization маскирует только слово Bearer, а токен остается
+    (re.compile(r'(?i)\bbearer\s+[\w\-.~+/=]+'), 'Bearer ' + REDACTED),
+    # ключи без \b в начале, чтобы находились и составные (verification_code, csrf_token);
+    # значение в кавычках маскируется целиком, даже с пробелами
+    (
+        re.compile(
+            r'(?i)(["\']?(?:%s)\b["\']?\s*[:=]\s*)("[^"]*"|\'[^\']*\'|[^\s,;&})]+)' % '|'.join(SECRET_KEYS)
+        ),
+        lambda match: match.group(1) + _mask_value(match.group(2)),
+    ),
+    (re.compile(r'\$2[aby]\$\d{2}\$[./A-Za-z0-9]{53}'), REDACTED),
+    (re.compile(r'\beyJ[\w-]+\.[\w-]+\.[\w-]+'), REDACTED),
+)
+# стандартные атрибуты LogRecord, остальные попадают в JSON как extra
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+# логгеры из get_logging_config со своими обработчиками
+_CONFIGURED_LOGGERS = ('', 'uvicorn', 'uvicorn.access', 'sqlalchemy')
+
+_listener: Optional[QueueListener] = None
+
+
+def redact(text: str) -> str:
+    """Замена секретов (пароли, токены, bcrypt-хэши) в строке"""
+    for pattern, replacement in _SECRET_PATTERNS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def _redact_extra(key: str, value: Any) -> Any:
+    """Значение extra-атрибута записи без секретов"""
+    if key.lower() in SECRET_KEYS:
+        return REDACTED
+    if isinstance(value, str):
+        return redact(value)
+    if isinstance(value, dict):
+        return {k: _redact_extra(str(k), v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_redact_extra('', item) for item in value]
+    return value
+
+
+class JSONFormatter(logging.Formatter):
+    """Форматирование записи в одну JSON-строку"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: Dict[str, Any] = {
+            'ts': f"{self.formatTime(record, '%Y-%m-%dT%H:%M:%S')}.{int(record.msecs):03d}",
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                payload[key] = _redact_extra(key, value)
+        if record.exc_info:
+            payload['exc_info'] = redact(self.formatException(record.exc_info))
+        if record.stack_info:
+            payload['stack_info'] = self.formatStack(record.stack_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class RedactingFilter(logging.Filter):
+    """Удаление секретов из сообщения; выполняется в потоке QueueListener"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.name == 'uvicorn.access' and isinstance(record.args, tuple):
+            # AccessFormatter собирает строку запроса из args, поэтому они редактируются по отдельности
+            record.args = tuple(redact(arg) if isinstance(arg, str) else arg for arg in record.args)
+        else:
+            record.msg = redact(record.getMessage())
+            record.args = None
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Сэмплирование записей ниже WARNING по префиксу имени логгера"""
+
+    def __init__(self, rates: Dict[str, float]) -> None:
+        super().__init__()
+        # более длинные префиксы проверяются первыми
+        self.rates = sorted(rates.items(), key=lambda item: len(item[0]), reverse=True)
+
+    def rate_for(self, name: str) -> float:
+        for prefix, rate in self.rates:
+            if not prefix or name == prefix or name.startswith(prefix + '.'):
+                return rate
+        return 1.0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rate_for(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class RateLimitFilter(logging.Filter):
+    """Не больше limit записей одного шаблона (логгер, msg) за interval секунд"""
+
+    max_keys = 10000
+
+    def __init__(self, limit: int, interval: float) -> None:
+        super().__init__()
+        self.limit = limit
+        self.interval = interval
+        self.suppressed = 0
+        # ключ -> [начало окна, записано, отброшено]
+        self._windows: Dict[Tuple[str, Any], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                if window is not None and window[2]:
+                    # первая запись нового окна сообщает, сколько было отброшено в прошлом
+                    record.suppressed = window[2]
+                if window is None and len(self._windows) >= self.max_keys:
+                    self._windows.clear()
+                self._windows[key] = [now, 1, 0]
+                return True
+            if window[1] < self.limit:
+                window[1] += 1
+                return True
+            window[2] += 1
+            self.suppressed += 1
+            return False
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Помещает запись в общую очередь вместе с обработчиками своего логгера.
+    Не форматирует запись и не блокирует при переполнении очереди, лишние записи отбрасываются"""
+
+    dropped = 0
+
+    def __init__(self, log_queue: queue.Queue, targets: list) -> None:
+        super().__init__(log_queue)
+        self.targets = tuple(targets)
+
+    def prepare(self, record: logging.LogRecord) -> Tuple[logging.LogRecord, tuple]:
+        # форматирование и редактирование секретов выполняются в потоке QueueListener
+        return record, self.targets
+
+    def enqueue(self, item: Tuple[logging.LogRecord, tuple]) -> None:
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            NonBlockingQueueHandler.dropped += 1
+
+
+class RoutingQueueListener(QueueListener):
+    """QueueListener, передающий запись только обработчикам логгера-источника"""
+
+    def enqueue_sentinel(self) -> None:
+        # при остановке ждём места в очереди, чтобы не потерять сигнал завершения
+        self.queue.put(self._sentinel)
+
+    def handle(self, item: Tuple[logging.LogRecord, tuple]) -> None:
+        record, targets = item
+        for handler in targets:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+
 def get_logging_config(
     log_level: str | None = "INFO",
+    json_logs: bool = False,
 ) -> dict[str, Any]:
     log_default_handlers: list[str] = [
         "console",
     ]
 
+    formatters: dict[str, Any] = {
+        "verbose": {
+            "()": "uvicorn.logging.DefaultFormatter",
+            "fmt": "%(levelprefix)s [%(asctime)s] - %(message)s",
+            "use_colors": True,
+        },
+        "default": {
+            "()": "uvicorn.logging.DefaultFormatter",
+            "fmt": "%(levelprefix)s [%(asctime)s] - %(message)s",
+            "use_colors": True,
+        },
+        "access": {
+            "()": "uvicorn.logging.AccessFormatter",
+            "fmt": "%(levelprefix)s [%(asctime)s] - %(request_line)s %(status_code)s",
+            "use_colors": True,
+        },
+    }
+    if json_logs:
+        formatters = {name: {"()": JSONFormatter} for name in formatters}
+
     return {
         "version": 1,
         "disable_existing_loggers": False,
-        "formatters": {
-            "verbose": {
-                "()": "uvicorn.logging.DefaultFormatter",
-                "fmt": "%(levelprefix)s [%(asctime)s] - %(message)s",
-                "use_colors": True,
-            },
-            "default": {
-                "()": "uvicorn.logging.DefaultFormatter",
-                "fmt": "%(levelprefix)s [%(asctime)s] - %(message)s",
-                "use_colors": True,
-            },
-            "access": {
-                "()": "uvicorn.logging.AccessFormatter",
-                "fmt": "%(levelprefix)s [%(asctime)s] - %(request_line)s %(status_code)s",
-                "use_colors": True,
-            },
-        },
+        "formatters": formatters,
         "handlers": {
             "console": {
                 "level": log_level,
@@ -81,3 +277,47 @@ def get_logging_config(
             "handlers": log_default_handlers,
         },
     }
+
+
+def setup_logging(log_level: str = "INFO") -> QueueListener:
+    """Настройка логирования: логгеры только кладут запись в очередь, а форматирование,
+    редактирование секретов и вывод выполняются в фоновом потоке QueueListener"""
+    global _listener
+    stop_logging()
+    dictConfig(get_logging_config(log_level=log_level, json_logs=settings.log_json))
+
+    log_queue: queue.Queue = queue.Queue(maxsize=settings.log_queue_maxsize)
+    filters: list[logging.Filter] = []
+    if settings.log_sampling:
+        filters.append(SamplingFilter(settings.log_sampling))
+    if settings.log_rate_limit > 0:
+        filters.append(RateLimitFilter(settings.log_rate_limit, settings.log_rate_limit_interval))
+
+    # обработчики из конфигурации переносятся в listener, логгеры получают QueueHandler
+    redacting = RedactingFilter()
+    handlers: list[logging.Handler] = []
+    for name in _CONFIGURED_LOGGERS:
+        logger = logging.getLogger(name)
+        for handler in logger.handlers:
+            if handler not in handlers:
+                handler.addFilter(redacting)
+                handlers.append(handler)
+        queue_handler = NonBlockingQueueHandler(log_queue, logger.handlers)
+        for log_filter in filters:
+            queue_handler.addFilter(log_filter)
+        logger.handlers = [queue_handler]
+
+    _listener = RoutingQueueListener(log_queue, *handlers)
+    _listener.start()
+    return _listener
+
+
+def stop_logging() -> None:
+    """Остановка фонового потока с выводом оставшихся в очереди записей"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
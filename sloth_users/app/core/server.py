@@ -0,0 +1,59 @@
+import importlib.util
+import logging
+import os
+
+import uvicorn
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# реализации, которые требуют отдельных пакетов
+OPTIONAL_IMPLEMENTATIONS = {
+    'uvloop': 'uvloop',
+    'httptools': 'httptools',
+}
+
+
+def resolve_workers() -> int:
+    """Число воркеров: явное значение или по числу CPU, доступных процессу"""
+    if settings.server_workers > 0:
+        return settings.server_workers
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def resolve_implementation(value: str) -> str:
+    """Проверка, что выбранная реализация loop/http установлена; иначе откат на auto"""
+    package = OPTIONAL_IMPLEMENTATIONS.get(value)
+    if package and importlib.util.find_spec(package) is None:
+        logger.warning(f'{value} не установлен, используется auto')
+        return 'auto'
+    return value
+
+
+def run_server(app: str = 'main:app') -> None:
+    """Запуск uvicorn с настройками из Settings; воркеры форкаются и каждый поднимает свои пулы в lifespan"""
+    workers = resolve_workers()
+    if workers > 1 and settings.password_hasher_max_workers is None:
+        # делим CPU между воркерами, чтобы пулы хэширования не конкурировали за ядра
+        os.environ['PASSWORD_HASHER_MAX_WORKERS'] = str(max(1, (os.cpu_count() or 1) // workers))
+    if workers > 1 and settings.postgres_pool_max_size is None:
+        # каждый воркер поднимает свой пул, поэтому бюджет соединений с бд делится между ними
+        os.environ['POSTGRES_POOL_MAX_SIZE'] = str(max(1, settings.postgres_pool_total_max_size // workers))
+    uvicorn.run(
+        app,
+        host=settings.host,
+        port=settings.port,
+        workers=workers,
+        loop=resolve_implementation(settings.server_loop),
+        http=resolve_implementation(settings.server_http),
+        backlog=settings.server_backlog,
+        timeout_keep_alive=settings.server_keepalive_timeout,
+        limit_concurrency=settings.server_limit_concurrency,
+        limit_max_requests=settings.server_limit_max_requests,
+        log_level=settings.log_level,
+        access_log=settings.is_debug,
+    )
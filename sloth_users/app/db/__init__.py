@@ -1,26 +1,86 @@
 import asyncpg
-from typing import AsyncGenerator, Optional
+from contextlib import asynccontextmanager
+from fastapi import HTTPException, status
+from typing import AsyncGenerator, AsyncIterator, Optional
 
 from app.core.config import settings
+from app.db.statements import prepare_statements
 
 DATABASE_URL = settings.postgres_url
 
-connection: Optional[asyncpg.Connection] = None
-
-async def lifespan(app) -> AsyncGenerator:
-    """Функция инициализации контекстного менеджера жизненного цикла для соединения с бд"""
-    global connection
-    if connection is None:
-        connection = await asyncpg.connect(str(DATABASE_URL))
-        print('Соединение с базой данных установлено')
-    yield
-    if connection is not None:
-        await connection.close()
-        print('Соединение с базой данных закрыто')
-
-async def get_db():
-    """Dependency для получения соединения с бд"""
-    global connection
-    if connection is None:
-        connection = await asyncpg.connect(DATABASE_URL)
-    yield connection
+pool: Optional[asyncpg.Pool] = None
+
+
+def pool_max_size() -> int:
+    """Максимальный размер пула процесса"""
+    return settings.postgres_pool_max_size or settings.postgres_pool_total_max_size
+
+
+async def create_pool() -> asyncpg.Pool:
+    """Создание пула соединений с бд по настройкам приложения"""
+    max_size = pool_max_size()
+    return await asyncpg.create_pool(
+        dsn=str(DATABASE_URL),
+        min_size=min(settings.postgres_pool_min_size, max_size),
+        max_size=max_size,
+        max_inactive_connection_lifetime=settings.postgres_pool_max_inactive_lifetime,
+        command_timeout=settings.postgres_command_timeout,
+        init=prepare_statements,
+    )
+
+
+async def init_pool() -> None:
+    """Инициализация пула соединений с бд"""
+    global pool
+    if pool is None:
+        pool = await create_pool()
+        print('Пул соединений с базой данных создан')
+
+
+async def close_pool() -> None:
+    """Закрытие пула соединений с бд"""
+    global pool
+    if pool is not None:
+        await pool.close()
+        pool = None
+        print('Пул соединений с базой данных закрыт')
+
+
+@asynccontextmanager
+async def acquire_connection() -> AsyncIterator[asyncpg.Connection]:
+    """Получение соединения из пула с таймаутом ожидания"""
+    if pool is None:
+        await init_pool()
+    try:
+        conn = await pool.acquire(timeout=settings.postgres_pool_acquire_timeout)
+    except TimeoutError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail='Database connection pool is exhausted'
+        )
+    try:
+        yield conn
+    finally:
+        await pool.release(conn)
+
+
+async def get_db() -> AsyncGenerator[asyncpg.Connection, None]:
+    """Dependency для получения соединения из пула на время запроса"""
+    async with acquire_connection() as conn:
+        yield conn
+
+
+def get_pool_stats() -> dict:
+    """Текущее состояние пула соединений с бд"""
+    if pool is None:
+        return {'initialized': False}
+    size = pool.get_size()
+    idle = pool.get_idle_size()
+    return {
+        'initialized': True,
+        'min_size': pool.get_min_size(),
+        'max_size': pool.get_max_size(),
+        'size': size,
+        'idle': idle,
+        'in_use': size - idle,
+    }
@@ -0,0 +1,130 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import List, Optional
+
+from app.core.config import settings
+from app.db import acquire_connection
+
+logger = logging.getLogger(__name__)
+
+AUDIT_COLUMNS = ['user_agent', 'cookie', 'real_ip', 'referer', 'created_at']
+
+
+class AuditWriter:
+    """Буферизованная запись аудита запросов: очередь в памяти и пакетный COPY в фоне"""
+
+    def __init__(
+        self,
+        table: str = 'request_logs',
+        queue_maxsize: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        drop_policy: str = 'drop_newest',
+    ) -> None:
+        if drop_policy not in ('drop_newest', 'drop_oldest'):
+            raise ValueError("drop_policy must be 'drop_newest' or 'drop_oldest'")
+        self.table = table
+        self.queue_maxsize = queue_maxsize
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.drop_policy = drop_policy
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self._enqueued = 0
+        self._written = 0
+        self._dropped = 0
+        self._failed = 0
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_maxsize)
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name='audit-writer')
+
+    async def stop(self) -> None:
+        """Остановка фоновой задачи с записью всего, что осталось в очереди"""
+        if self._task is None:
+            return
+        self._stopping.set()
+        await self._task
+        self._task = None
+
+    def enqueue(
+        self,
+        user_agent: Optional[str],
+        cookie: Optional[str],
+        real_ip: Optional[str],
+        referer: Optional[str],
+    ) -> None:
+        """Неблокирующая постановка записи в очередь; при переполнении срабатывает политика сброса"""
+        if self._queue is None:
+            return
+        record = (user_agent, cookie, real_ip, referer, datetime.now())
+        if self._queue.full():
+            if self.drop_policy == 'drop_newest':
+                self._dropped += 1
+                return
+            self._queue.get_nowait()
+            self._dropped += 1
+        self._queue.put_nowait(record)
+        self._enqueued += 1
+
+    def _drain(self, limit: int) -> List[tuple]:
+        records = []
+        while len(records) < limit and not self._queue.empty():
+            records.append(self._queue.get_nowait())
+        return records
+
+    async def _run(self) -> None:
+        while not (self._stopping.is_set() and self._queue.empty()):
+            try:
+                first = await asyncio.wait_for(self._queue.get(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                continue
+            records = [first]
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + self.flush_interval
+            while len(records) < self.batch_size:
+                records.extend(self._drain(self.batch_size - len(records)))
+                timeout = deadline - loop.time()
+                if len(records) >= self.batch_size or timeout <= 0 or self._stopping.is_set():
+                    break
+                try:
+                    records.append(await asyncio.wait_for(self._queue.get(), timeout=timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._flush(records)
+
+    async def _flush(self, records: List[tuple]) -> None:
+        if not records:
+            return
+        try:
+            async with acquire_connection() as conn:
+                await conn.copy_records_to_table(self.table, records=records, columns=AUDIT_COLUMNS)
+        except Exception as e:
+            self._failed += len(records)
+            logger.error(f'Не удалось записать {len(records)} записей аудита: {e}')
+            return
+        self._written += len(records)
+
+    def stats(self) -> dict:
+        return {
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'queue_maxsize': self.queue_maxsize,
+            'enqueued': self._enqueued,
+            'written': self._written,
+            'dropped': self._dropped,
+            'failed': self._failed,
+        }
+
+
+audit_writer = AuditWriter(
+    table=settings.audit_table,
+    queue_maxsize=settings.audit_queue_maxsize,
+    batch_size=settings.audit_batch_size,
+    flush_interval=settings.audit_flush_interval,
+    drop_policy=settings.audit_drop_policy,
+)
@@ -0,0 +1,202 @@
+import argparse
+import asyncio
+import codecs
+import csv
+import json
+import time
+from datetime import datetime
+from typing import AsyncIterable, AsyncIterator, Iterable, List, Optional, Union
+from uuid import uuid4
+
+import asyncpg
+from pydantic import ValidationError
+
+from app.api.utils.hashing import password_hasher
+from app.core.config import settings
+from app.db.functions import execute_get_existing_emails
+from app.schemas.users import UserCreate
+
+USER_COLUMNS = ['id', 'username', 'email', 'phone', 'is_verified', 'rating', 'role', 'created_at', 'updated_at']
+PASSWORD_COLUMNS = ['user_id', 'hashed_pass', 'created_at', 'updated_at']
+
+
+async def _hash_password(password: str, hash_slots: asyncio.Semaphore) -> str:
+    async with hash_slots:
+        return await password_hasher.hash(password)
+
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    """Построчное чтение потока байтов с инкрементальным декодированием utf-8"""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split('\n')
+        for line in lines:
+            yield line.rstrip('\r')
+    buffer += decoder.decode(b'', final=True)
+    if buffer:
+        yield buffer.rstrip('\r')
+
+
+async def iter_rows(lines: AsyncIterable[str], fmt: str) -> AsyncIterator[Union[dict, ValueError]]:
+    """Разбор строк CSV (с заголовком) или NDJSON в словари; неразборные строки отдаются как ValueError"""
+    header: Optional[List[str]] = None
+    async for line in lines:
+        if not line.strip():
+            continue
+        if fmt == 'ndjson':
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield ValueError(f'invalid json: {e}')
+                continue
+            yield row if isinstance(row, dict) else ValueError('row is not a json object')
+            continue
+        try:
+            values = next(csv.reader([line]))
+        except csv.Error as e:
+            yield ValueError(f'invalid csv: {e}')
+            continue
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        yield {name: value for name, value in zip(header, values) if value != ''}
+
+
+class BulkImportReport:
+    """Итоги массового импорта пользователей"""
+
+    def __init__(self, max_errors: int) -> None:
+        self.max_errors = max_errors
+        self.total = 0
+        self.imported = 0
+        self.failed = 0
+        self.errors: List[dict] = []
+        self.started = time.perf_counter()
+
+    def add_error(self, row: int, error: str) -> None:
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'row': row, 'error': error})
+
+    def as_dict(self) -> dict:
+        elapsed = time.perf_counter() - self.started
+        return {
+            'total': self.total,
+            'imported': self.imported,
+            'failed': self.failed,
+            'errors': self.errors,
+            'elapsed_seconds': round(elapsed, 3),
+            'rows_per_second': round(self.imported / elapsed, 1) if elapsed > 0 else 0.0,
+        }
+
+
+async def _import_chunk(
+    conn: asyncpg.Connection,
+    chunk: List[tuple[int, UserCreate]],
+    seen_emails: set,
+    report: BulkImportReport,
+    hash_slots: asyncio.Semaphore
+) -> None:
+    existing = await execute_get_existing_emails(conn, [user.email for _, user in chunk])
+    accepted = []
+    for row_number, user in chunk:
+        if user.email in existing or user.email in seen_emails:
+            report.add_error(row_number, f'email {user.email} already exists')
+            continue
+        seen_emails.add(user.email)
+        accepted.append((row_number, user))
+    if not accepted:
+        return
+
+    hashes = await asyncio.gather(*(_hash_password(user.hashed_pass, hash_slots) for _, user in accepted))
+    now = datetime.now()
+    users, passwords = [], []
+    for (_, user), hashed_pass in zip(accepted, hashes):
+        user_id = uuid4()
+        users.append((
+            user_id, user.username, user.email, user.phone, user.is_verified,
+            float(user.rating) if user.rating is not None else None, user.role,
+            user.created_at or now, user.updated_at or now
+        ))
+        passwords.append((user_id, hashed_pass, now, now))
+
+    try:
+        async with conn.transaction():
+            await conn.copy_records_to_table('users', records=users, columns=USER_COLUMNS)
+            await conn.copy_records_to_table('passwords', records=passwords, columns=PASSWORD_COLUMNS)
+    except asyncpg.PostgresError as e:
+        for row_number, _ in accepted:
+            report.add_error(row_number, f'chunk rejected by database: {e}')
+        return
+    report.imported += len(accepted)
+
+
+async def import_users(
+    conn: asyncpg.Connection,
+    rows: AsyncIterable[Union[dict, ValueError]],
+    chunk_size: Optional[int] = None,
+    max_errors: Optional[int] = None,
+    hash_concurrency: Optional[int] = None
+) -> dict:
+    """Потоковый импорт пользователей: валидация, хэширование в пуле и загрузка через COPY по чанкам.
+    hash_concurrency - число одновременных задач импорта в пуле хэширования (по умолчанию все его процессы)"""
+    chunk_size = chunk_size or settings.bulk_import_chunk_size
+    hash_slots = asyncio.Semaphore(hash_concurrency or password_hasher.max_workers)
+    report = BulkImportReport(max_errors if max_errors is not None else settings.bulk_import_max_errors)
+    seen_emails: set = set()
+    chunk: List[tuple[int, UserCreate]] = []
+    row_number = 0
+    async for row in rows:
+        row_number += 1
+        report.total += 1
+        if isinstance(row, ValueError):
+            report.add_error(row_number, str(row))
+            continue
+        try:
+            chunk.append((row_number, UserCreate.model_validate(row)))
+        except ValidationError as e:
+            report.add_error(row_number, json.dumps(e.errors(include_url=False), default=str, ensure_ascii=False))
+            continue
+        if len(chunk) >= chunk_size:
+            await _import_chunk(conn, chunk, seen_emails, report, hash_slots)
+            chunk = []
+    if chunk:
+        await _import_chunk(conn, chunk, seen_emails, report, hash_slots)
+    return report.as_dict()
+
+
+async def _iter_file(lines: Iterable[str]) -> AsyncIterator[str]:
+    for line in lines:
+        yield line.rstrip('\r\n')
+
+
+async def main(path: str, fmt: str, chunk_size: Optional[int], hash_concurrency: Optional[int]) -> None:
+    from app.db import acquire_connection, close_pool, init_pool
+
+    await init_pool()
+    password_hasher.start()
+    try:
+        with open(path, encoding='utf-8', newline='') as file:
+            async with acquire_connection() as conn:
+                report = await import_users(
+                    conn, iter_rows(_iter_file(file), fmt), chunk_size, hash_concurrency=hash_concurrency
+                )
+    finally:
+        password_hasher.shutdown()
+        await close_pool()
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Массовый импорт пользователей из CSV или NDJSON')
+    parser.add_argument('path', help='путь к файлу с пользователями')
+    parser.add_argument('--format', dest='fmt', choices=('csv', 'ndjson'), default='csv')
+    parser.add_argument('--chunk-size', type=int, default=None)
+    parser.add_argument(
+        '--hash-concurrency', type=int, default=None,
+        help='одновременных хэширований (по умолчанию по числу процессов пула)'
+    )
+    args = parser.parse_args()
+    asyncio.run(main(args.path, args.fmt, args.chunk_size, args.hash_concurrency))
@@ -1,24 +1,79 @@
 import asyncpg
 from uuid import UUID
-from typing import List, Dict, Optional
+from typing import AsyncIterator, List, Dict, Optional, Tuple
 from fastapi import HTTPException, status
 
+from app.api.utils.singleflight import SingleFlight
+from app.db import statements
+from app.db.statements import USERS_BY_ROLE_PAGE_QUERY, USERS_PAGE_QUERY
+
+# одновременные чтения одного пользователя выполняют один запрос к бд
+user_lookups = SingleFlight('get_user_by_id')
+
 async def execute_get_all_users(conn: asyncpg.Connection) -> List[Dict]:
-    query = '''
-    SELECT * FROM get_all_users();
-    '''
-    result = await conn.fetch(query)
+    result = await statements.fetch(conn, 'get_all_users')
+    return [dict(record) for record in result]
+
+def _users_page_args(after: Optional[UUID], role: Optional[str], is_verified: Optional[bool]) -> Tuple[str, list]:
+    """Имя запроса страницы пользователей и его параметры: с фильтром по роли и без него"""
+    if role is None:
+        return 'get_users_page', [after, is_verified]
+    return 'get_users_page_by_role', [after, is_verified, role]
+
+async def execute_get_users_page(
+    conn: asyncpg.Connection,
+    limit: int,
+    after: Optional[UUID] = None,
+    role: Optional[str] = None,
+    is_verified: Optional[bool] = None
+) -> List[Dict]:
+    name, args = _users_page_args(after, role, is_verified)
+    result = await statements.fetch(conn, name, *args, limit)
+    return [dict(record) for record in result]
+
+async def iterate_users(
+    conn: asyncpg.Connection,
+    after: Optional[UUID] = None,
+    role: Optional[str] = None,
+    is_verified: Optional[bool] = None,
+    prefetch: int = 500
+) -> AsyncIterator[asyncpg.Record]:
+    """Построчное чтение пользователей через серверный курсор (нужна открытая транзакция)"""
+    name, args = _users_page_args(after, role, is_verified)
+    query = USERS_PAGE_QUERY if name == 'get_users_page' else USERS_BY_ROLE_PAGE_QUERY
+    async for record in conn.cursor(query, *args, prefetch=prefetch):
+        yield record
+
+async def execute_get_users_by_ids(conn: asyncpg.Connection, user_ids: List[UUID]) -> List[Dict]:
+    result = await statements.fetch(conn, 'get_users_by_ids', user_ids)
     return [dict(record) for record in result]
 
 async def execute_get_user_by_id(conn: asyncpg.Connection, user_id: UUID) -> Optional[Dict]:
-    query = '''
-    SELECT * FROM get_user_by_id($1);
-    '''
-    result = await conn.fetchrow(query, user_id)
+    result = await user_lookups.do(user_id, lambda: statements.fetchrow(conn, 'get_user_by_id', user_id))
     return dict(result) if result else None
 
+async def execute_get_user_id_by_email(conn: asyncpg.Connection, email: str) -> Optional[UUID]:
+    return await statements.fetchval(conn, 'get_user_id_by_email', email)
+
+async def execute_get_existing_emails(conn: asyncpg.Connection, emails: List[str]) -> set:
+    return {record['email'] for record in await statements.fetch(conn, 'get_existing_emails', emails)}
+
+async def execute_mark_user_verified(conn: asyncpg.Connection, user_id: UUID, email: str) -> bool:
+    """Подтверждение пользователя одним запросом; False, если пользователя с таким email уже нет"""
+    return await statements.fetchval(conn, 'mark_user_verified', user_id, email) is not None
+
+async def execute_get_password_history(conn: asyncpg.Connection, user_id: UUID, limit: int) -> List[asyncpg.Record]:
+    return await statements.fetch(conn, 'get_password_history', user_id, limit)
+
+async def execute_insert_password(conn: asyncpg.Connection, user_id: UUID, hashed_pass: str) -> None:
+    await statements.execute(conn, 'insert_password', user_id, hashed_pass)
+
+async def execute_rehash_password(conn: asyncpg.Connection, user_id: UUID, old_hash: str, new_hash: str) -> bool:
+    """Замена текущего хэша пароля; False, если хэш уже изменен или пароль сменили"""
+    return await statements.fetchval(conn, 'rehash_password', user_id, old_hash, new_hash) is not None
+
 async def execute_delete_user(conn: asyncpg.Connection, user_id: UUID) -> None:
     try:
-        await conn.execute('SELECT delete_user_by_id($1)', user_id)
+        await statements.execute(conn, 'delete_user_by_id', user_id)
     except asyncpg.exceptions.RaiseException as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
@@ -26,6 +26,14 @@ CREATE TABLE IF NOT EXISTS passwords (
     updated_at TIMESTAMP DEFAULT NOW()
 );
 
+CREATE TABLE IF NOT EXISTS request_logs (
+    user_agent TEXT,
+    cookie TEXT,
+    real_ip TEXT,
+    referer TEXT,
+    created_at TIMESTAMP DEFAULT NOW()
+);
+
 CREATE OR REPLACE FUNCTION update_timestamp()
 RETURNS TRIGGER AS $$
 BEGIN
@@ -175,4 +183,5 @@ $$ LANGUAGE plpgsql;
 
 -- Создаём индексы, если они ещё не существуют
 CREATE INDEX IF NOT EXISTS idx_users_email ON users (email);
-CREATE INDEX IF NOT EXISTS idx_users_username ON users (username);
\ No newline at end of file
+CREATE INDEX IF NOT EXISTS idx_users_username ON users (username);
+CREATE INDEX IF NOT EXISTS idx_users_role_id ON users (role, id);
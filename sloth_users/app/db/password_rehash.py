@@ -0,0 +1,74 @@
+import asyncio
+import logging
+from typing import Set
+from uuid import UUID
+
+from app.api.utils.hashing import password_hasher
+from app.api.utils.pass_utils import needs_update
+from app.core.config import settings
+from app.db import acquire_connection
+from app.db.functions import execute_rehash_password
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordRehasher:
+    """Фоновая замена текущего хэша пароля с устаревшей стоимостью bcrypt после успешной проверки пароля.
+    Новый хэш считается в фоне, поэтому проверка не удлиняет запрос"""
+
+    def __init__(self, enabled: bool = True, max_pending: int = 1000) -> None:
+        self.enabled = enabled
+        self.max_pending = max_pending
+        self._tasks: Set[asyncio.Task] = set()
+        self._scheduled = 0
+        self._updated = 0
+        self._skipped = 0
+        self._failed = 0
+
+    def schedule(self, user_id: UUID, password: str, current_hash: str) -> bool:
+        """Постановка замены текущего хэша, проверенного паролем password, в фон, если его стоимость устарела.
+        Не блокирует запрос, при переполнении замена пропускается"""
+        if not self.enabled or not needs_update(current_hash):
+            return False
+        if len(self._tasks) >= self.max_pending:
+            self._skipped += 1
+            return False
+        task = asyncio.create_task(self._rehash(user_id, password, current_hash))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        self._scheduled += 1
+        return True
+
+    async def _rehash(self, user_id: UUID, password: str, old_hash: str) -> None:
+        try:
+            new_hash = await password_hasher.hash(password)
+            async with acquire_connection() as conn:
+                if await execute_rehash_password(conn, user_id, old_hash, new_hash):
+                    self._updated += 1
+                else:
+                    self._skipped += 1
+        except Exception as e:
+            self._failed += 1
+            logger.warning('Не удалось обновить хэш пароля пользователя %s: %s', user_id, e)
+
+    async def stop(self) -> None:
+        """Ожидание замен, поставленных до остановки"""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            'enabled': self.enabled,
+            'bcrypt_rounds': settings.bcrypt_rounds,
+            'pending': len(self._tasks),
+            'scheduled': self._scheduled,
+            'updated': self._updated,
+            'skipped': self._skipped,
+            'failed': self._failed,
+        }
+
+
+password_rehasher = PasswordRehasher(
+    enabled=settings.bcrypt_rehash_on_verify,
+    max_pending=settings.bcrypt_rehash_max_pending,
+)
@@ -0,0 +1,51 @@
+from redis import asyncio as aioredis
+from typing import Optional
+
+from app.core.config import settings
+
+REDIS_URL = f"redis://{settings.redis_host}:{settings.redis_port}/{settings.redis_db}"
+
+redis_client: Optional[aioredis.Redis] = None
+
+
+def create_redis() -> aioredis.Redis:
+    """Создание асинхронного клиента Redis с пулом соединений"""
+    pool = aioredis.ConnectionPool.from_url(
+        REDIS_URL,
+        max_connections=settings.redis_max_connections,
+        socket_timeout=settings.redis_socket_timeout,
+        socket_connect_timeout=settings.redis_socket_connect_timeout,
+        health_check_interval=settings.redis_health_check_interval,
+        decode_responses=True,
+    )
+    return aioredis.Redis(connection_pool=pool)
+
+
+async def init_redis() -> None:
+    """Инициализация клиента Redis"""
+    global redis_client
+    if redis_client is None:
+        redis_client = create_redis()
+        print('Клиент Redis создан')
+
+
+async def close_redis() -> None:
+    """Закрытие клиента Redis и его пула соединений"""
+    global redis_client
+    if redis_client is not None:
+        await redis_client.aclose()
+        redis_client = None
+        print('Клиент Redis закрыт')
+
+
+def get_redis_client() -> aioredis.Redis:
+    """Текущий клиент Redis (создается при первом обращении)"""
+    global redis_client
+    if redis_client is None:
+        redis_client = create_redis()
+    return redis_client
+
+
+async def get_redis() -> aioredis.Redis:
+    """Dependency для получения клиента Redis"""
+    return get_redis_client()
@@ -0,0 +1,106 @@
+import hashlib
+from typing import Any, Sequence
+
+from redis import asyncio as aioredis
+from redis.exceptions import NoScriptError
+
+
+class RedisScript:
+    """Lua-скрипт Redis: вызов через EVALSHA с загрузкой через EVAL, если скрипта нет в кэше сервера"""
+
+    def __init__(self, name: str, source: str) -> None:
+        self.name = name
+        self.source = source
+        self.sha = hashlib.sha1(source.encode('utf-8')).hexdigest()
+
+    async def __call__(self, redis: aioredis.Redis, keys: Sequence[str], args: Sequence[Any]) -> Any:
+        try:
+            return await redis.evalsha(self.sha, len(keys), *keys, *args)
+        except NoScriptError:
+            return await redis.eval(self.source, len(keys), *keys, *args)
+
+
+# token bucket по нескольким ключам сразу: токены списываются только если их хватает во всех корзинах.
+# KEYS - ключи корзин; ARGV - текущее время, стоимость, затем пары (скорость в токенах/с, емкость) на каждый ключ.
+# Возвращает время ожидания в секундах строкой ('0' - запрос допущен)
+TOKEN_BUCKET = RedisScript('token_bucket', """
+local now = tonumber(ARGV[1])
+local cost = tonumber(ARGV[2])
+local wait = 0
+local tokens = {}
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[1 + i * 2])
+    local burst = tonumber(ARGV[2 + i * 2])
+    local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+    local available = tonumber(bucket[1]) or burst
+    local ts = tonumber(bucket[2]) or now
+    available = math.min(burst, available + math.max(0, now - ts) * rate)
+    if available < cost then
+        wait = math.max(wait, (cost - available) / rate)
+    end
+    tokens[i] = available
+end
+if wait > 0 then
+    return tostring(wait)
+end
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[1 + i * 2])
+    local burst = tonumber(ARGV[2 + i * 2])
+    redis.call('HSET', key, 'tokens', tokens[i] - cost, 'ts', now)
+    redis.call('EXPIRE', key, math.ceil(burst / rate) + 1)
+end
+return '0'
+""")
+
+# проверка кода подтверждения с его удалением при совпадении и подсчетом неудачных попыток.
+# KEYS[1] - ключ кода, KEYS[2] - ключ счетчика попыток; ARGV - код, максимум попыток, TTL счетчика в мс,
+# если у кода нет срока жизни. Возвращает {статус, оставшиеся попытки}:
+# 1 - код совпал и удален, 0 - не совпал, -1 - кода нет или он истек, -2 - попытки исчерпаны, код удален
+CHECK_AND_CONSUME_CODE = RedisScript('check_and_consume_code', """
+local stored = redis.call('GET', KEYS[1])
+if not stored then
+    return {-1, 0}
+end
+local max_attempts = tonumber(ARGV[2])
+local attempts = tonumber(redis.call('GET', KEYS[2]) or '0')
+if attempts >= max_attempts then
+    redis.call('DEL', KEYS[1], KEYS[2])
+    return {-2, 0}
+end
+if stored == ARGV[1] then
+    redis.call('DEL', KEYS[1], KEYS[2])
+    return {1, max_attempts - attempts}
+end
+attempts = redis.call('INCR', KEYS[2])
+local ttl = redis.call('PTTL', KEYS[1])
+if ttl <= 0 then
+    ttl = tonumber(ARGV[3])
+end
+redis.call('PEXPIRE', KEYS[2], ttl)
+if attempts >= max_attempts then
+    redis.call('DEL', KEYS[1], KEYS[2])
+    return {-2, 0}
+end
+return {0, max_attempts - attempts}
+""")
+
+# запись в кэш только если с момента чтения версии записи ее не инвалидировали.
+# KEYS[1] - ключ записи, KEYS[2] - ключ версии; ARGV - значение, TTL в секундах,
+# версия, прочитанная до запроса в бд ('' - версии не было). Возвращает 1, если запись сохранена
+CACHE_FILL = RedisScript('cache_fill', """
+local version = redis.call('GET', KEYS[2]) or ''
+if version ~= ARGV[3] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+return 1
+""")
+
+# инвалидация записи кэша: увеличение версии и удаление записи.
+# KEYS[1] - ключ записи, KEYS[2] - ключ версии; ARGV[1] - TTL версии в секундах
+CACHE_INVALIDATE = RedisScript('cache_invalidate', """
+redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], ARGV[1])
+redis.call('DEL', KEYS[1])
+return 1
+""")
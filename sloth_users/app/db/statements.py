@@ -0,0 +1,130 @@
+import json
+import logging
+import weakref
+from typing import Any, Dict, List, Optional
+
+import asyncpg
+from asyncpg.prepared_stmt import PreparedStatement
+
+from app.core.metrics import DB_QUERY_LATENCY
+
+logger = logging.getLogger(__name__)
+
+USER_COLUMNS = 'id, username, email, phone, is_verified, rating, role, created_at, updated_at'
+
+# запросы подготавливаются один раз на соединение и со временем выполняются по generic-плану, в котором
+# условия вида ($1 IS NULL OR ...) становятся фильтром строк, а не границей индекса. Поэтому курсор задается
+# через COALESCE, а фильтр по роли - отдельным запросом под индекс (role, id)
+MIN_UUID = '00000000-0000-0000-0000-000000000000'
+
+USERS_PAGE_QUERY = f'''
+SELECT {USER_COLUMNS}
+FROM users
+WHERE id > COALESCE($1::uuid, '{MIN_UUID}'::uuid)
+  AND ($2::boolean IS NULL OR is_verified = $2::boolean)
+ORDER BY id
+'''
+
+USERS_BY_ROLE_PAGE_QUERY = f'''
+SELECT {USER_COLUMNS}
+FROM users
+WHERE role = $3::text
+  AND id > COALESCE($1::uuid, '{MIN_UUID}'::uuid)
+  AND ($2::boolean IS NULL OR is_verified = $2::boolean)
+ORDER BY id
+'''
+
+# реестр всех запросов сервиса: имя -> текст запроса
+STATEMENTS: Dict[str, str] = {
+    'get_all_users': 'SELECT * FROM get_all_users()',
+    'get_user_by_id': 'SELECT * FROM get_user_by_id($1)',
+    'get_users_page': USERS_PAGE_QUERY + 'LIMIT $3',
+    'get_users_page_by_role': USERS_BY_ROLE_PAGE_QUERY + 'LIMIT $4',
+    'get_users_by_ids': f'SELECT {USER_COLUMNS} FROM users WHERE id = ANY($1::uuid[])',
+    'get_user_id_by_email': 'SELECT id FROM users WHERE email = $1',
+    'get_existing_emails': 'SELECT email FROM users WHERE email = ANY($1::text[])',
+    'get_password_history': '''
+        SELECT hashed_pass, created_at
+        FROM passwords
+        WHERE user_id = $1
+        ORDER BY created_at DESC
+        LIMIT $2
+    ''',
+    'insert_password': '''
+        INSERT INTO passwords (user_id, hashed_pass, created_at)
+        VALUES ($1, $2, NOW())
+    ''',
+    'rehash_password': '''
+        UPDATE passwords SET hashed_pass = $3
+        WHERE user_id = $1 AND hashed_pass = $2
+          AND created_at = (SELECT MAX(created_at) FROM passwords WHERE user_id = $1)
+        RETURNING user_id
+    ''',
+    'mark_user_verified': 'UPDATE users SET is_verified = TRUE WHERE id = $1 AND email = $2 RETURNING id',
+    'delete_user_by_id': 'SELECT delete_user_by_id($1)',
+    'create_user_procedure': 'CALL create_user_procedure($1, $2, $3, $4, $5, $6, $7, NULL)',
+}
+
+# подготовленные запросы по соединениям; соединения пула живут дольше запросов
+_prepared: 'weakref.WeakKeyDictionary[asyncpg.Connection, Dict[str, PreparedStatement]]' = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _raw_connection(conn: asyncpg.Connection) -> asyncpg.Connection:
+    """Соединение под прокси пула: прокси создается на каждый acquire, а кэш привязан к соединению"""
+    return getattr(conn, '_con', None) or conn
+
+
+async def register_codecs(conn: asyncpg.Connection) -> None:
+    """Регистрация кодеков типов для соединения"""
+    for type_name in ('json', 'jsonb'):
+        await conn.set_type_codec(type_name, encoder=json.dumps, decoder=json.loads, schema='pg_catalog')
+
+
+async def prepare_statements(conn: asyncpg.Connection) -> None:
+    """Инициализация соединения пула: кодеки и подготовка всех запросов реестра"""
+    await register_codecs(conn)
+    statements = _prepared.setdefault(_raw_connection(conn), {})
+    for name, query in STATEMENTS.items():
+        try:
+            statements[name] = await conn.prepare(query)
+        except asyncpg.PostgresError as e:
+            logger.warning(f"Не удалось подготовить запрос '{name}': {e}")
+
+
+async def get_statement(conn: asyncpg.Connection, name: str, refresh: bool = False) -> PreparedStatement:
+    """Подготовленный запрос реестра для соединения (готовится при первом обращении)"""
+    statements = _prepared.setdefault(_raw_connection(conn), {})
+    statement = statements.get(name)
+    if statement is None or refresh:
+        statement = await conn.prepare(STATEMENTS[name])
+        statements[name] = statement
+    return statement
+
+
+async def _run(conn: asyncpg.Connection, name: str, method: str, *args: Any) -> Any:
+    with DB_QUERY_LATENCY.time(name):
+        statement = await get_statement(conn, name)
+        try:
+            return await getattr(statement, method)(*args)
+        except asyncpg.exceptions.InvalidCachedStatementError:
+            # схема изменилась после подготовки запроса: готовим заново и повторяем
+            statement = await get_statement(conn, name, refresh=True)
+            return await getattr(statement, method)(*args)
+
+
+async def fetch(conn: asyncpg.Connection, name: str, *args: Any) -> List[asyncpg.Record]:
+    return await _run(conn, name, 'fetch', *args)
+
+
+async def fetchrow(conn: asyncpg.Connection, name: str, *args: Any) -> Optional[asyncpg.Record]:
+    return await _run(conn, name, 'fetchrow', *args)
+
+
+async def fetchval(conn: asyncpg.Connection, name: str, *args: Any) -> Any:
+    return await _run(conn, name, 'fetchval', *args)
+
+
+async def execute(conn: asyncpg.Connection, name: str, *args: Any) -> None:
+    await _run(conn, name, 'fetch', *args)
@@ -0,0 +1,135 @@
+import json
+import logging
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+from typing import Optional, Tuple
+from uuid import UUID
+
+import asyncpg
+from pydantic_core import to_json
+
+from app.api.utils.cache import TTLCache
+from app.core.config import settings
+from app.db.functions import execute_get_user_by_id, user_lookups
+from app.db.redis_scripts import CACHE_FILL, CACHE_INVALIDATE
+
+logger = logging.getLogger(__name__)
+
+# поля пользователя, которые попадают в кэш (без хэша пароля)
+CACHED_USER_FIELDS = (
+    'id', 'username', 'email', 'phone', 'is_verified', 'rating', 'role', 'created_at', 'updated_at'
+)
+
+
+class UserCache:
+    """Двухуровневый кэш пользователей: in-process LRU и Redis"""
+
+    def __init__(
+        self,
+        local_maxsize: int = 10000,
+        local_ttl: float = 5.0,
+        redis_ttl: int = 300,
+        prefix: str = 'user',
+    ) -> None:
+        self.local = TTLCache(maxsize=local_maxsize, ttl=local_ttl)
+        self.redis_ttl = redis_ttl
+        self.prefix = prefix
+        self._local_hits = 0
+        self._redis_hits = 0
+        self._misses = 0
+        self._stale_fills = 0
+
+    def _key(self, user_id: UUID) -> str:
+        return f'{self.prefix}:{user_id}'
+
+    def _version_key(self, user_id: UUID) -> str:
+        return f'{self.prefix}_version:{user_id}'
+
+    async def get(self, redis: aioredis.Redis, user_id: UUID) -> Tuple[Optional[dict], Optional[str]]:
+        """Запись из кэша и, при промахе, ее версия для последующего set
+        (None - версия неизвестна, запись в Redis не выполняется)"""
+        key = self._key(user_id)
+        user = self.local.get(key)
+        if user is not None:
+            self._local_hits += 1
+            return user, None
+        try:
+            raw, version = await redis.mget(key, self._version_key(user_id))
+        except RedisError as e:
+            logger.warning(f'Ошибка чтения кэша пользователя из Redis: {e}')
+            raw, version = None, None
+        else:
+            version = version or ''
+        if raw is None:
+            self._misses += 1
+            return None, version
+        user = json.loads(raw)
+        self.local.set(key, user)
+        self._redis_hits += 1
+        return user, None
+
+    async def set(self, redis: aioredis.Redis, user_id: UUID, user: dict, version: Optional[str]) -> None:
+        """Заполнение кэша прочитанной из бд записью. Запись сохраняется, только если версия не изменилась
+        с момента get: иначе запись инвалидировали во время чтения из бд и прочитанное могло устареть"""
+        key = self._key(user_id)
+        user = {field: user.get(field) for field in CACHED_USER_FIELDS}
+        if version is not None:
+            try:
+                stored = await CACHE_FILL(
+                    redis, [key, self._version_key(user_id)], [to_json(user), self.redis_ttl, version]
+                )
+            except RedisError as e:
+                logger.warning(f'Ошибка записи кэша пользователя в Redis: {e}')
+            else:
+                if not int(stored):
+                    self._stale_fills += 1
+                    return
+        self.local.set(key, user)
+
+    async def invalidate(self, redis: aioredis.Redis, user_id: UUID) -> None:
+        # версия в Redis увеличивается до удаления из локального кэша, чтобы конкурентное заполнение
+        # либо завершилось раньше и было удалено, либо увидело новую версию и не записалось
+        key = self._key(user_id)
+        try:
+            await CACHE_INVALIDATE(redis, [key, self._version_key(user_id)], [self.redis_ttl])
+        except RedisError as e:
+            logger.warning(f'Ошибка инвалидации кэша пользователя в Redis: {e}')
+        self.local.delete(key)
+
+    def stats(self) -> dict:
+        return {
+            'local': self.local.stats(),
+            'local_hits': self._local_hits,
+            'redis_hits': self._redis_hits,
+            'misses': self._misses,
+            'stale_fills': self._stale_fills,
+        }
+
+
+user_cache = UserCache(
+    local_maxsize=settings.user_cache_local_maxsize,
+    local_ttl=settings.user_cache_local_ttl,
+    redis_ttl=settings.user_cache_redis_ttl,
+    prefix=settings.user_cache_prefix,
+)
+
+
+async def get_user_cached(conn: asyncpg.Connection, redis: aioredis.Redis, user_id: UUID) -> Optional[dict]:
+    """Чтение пользователя через кэш с fallback на бд"""
+    if not settings.user_cache_enabled:
+        return await execute_get_user_by_id(conn, user_id)
+    user, version = await user_cache.get(redis, user_id)
+    if user is not None:
+        return user
+    user = await execute_get_user_by_id(conn, user_id)
+    if user is not None:
+        await user_cache.set(redis, user_id, user, version)
+    return user
+
+
+async def invalidate_user(redis: aioredis.Redis, user_id: UUID) -> None:
+    """Сброс закэшированной записи пользователя после изменения"""
+    # начатое до изменения чтение из бд не должно отдаваться последующим запросам
+    user_lookups.forget(user_id)
+    if settings.user_cache_enabled:
+        await user_cache.invalidate(redis, user_id)
@@ -0,0 +1,65 @@
+from typing import Tuple
+
+from redis import asyncio as aioredis
+
+from app.core.config import settings
+from app.db.redis_scripts import CHECK_AND_CONSUME_CODE
+
+# результаты проверки кода подтверждения
+CODE_VALID = 'valid'
+CODE_INVALID = 'invalid'
+CODE_MISSING = 'missing'
+CODE_LOCKED = 'locked'
+
+_STATUSES = {1: CODE_VALID, 0: CODE_INVALID, -1: CODE_MISSING, -2: CODE_LOCKED}
+
+
+class VerificationStore:
+    """Коды подтверждения email в Redis: проверка и удаление кода одним атомарным вызовом
+    с ограничением числа неудачных попыток"""
+
+    def __init__(
+        self,
+        code_prefix: str = 'verification_code',
+        attempts_prefix: str = 'verification_attempts',
+        max_attempts: int = 5,
+        attempts_ttl: int = 900,
+    ) -> None:
+        self.code_prefix = code_prefix
+        self.attempts_prefix = attempts_prefix
+        self.max_attempts = max_attempts
+        self.attempts_ttl = attempts_ttl
+        self._checked = 0
+        self._consumed = 0
+        self._locked = 0
+
+    async def check_and_consume(self, redis: aioredis.Redis, email: str, code: str) -> Tuple[str, int]:
+        """Проверка кода; при совпадении код удаляется. Возвращает статус и число оставшихся попыток"""
+        self._checked += 1
+        status, remaining = await CHECK_AND_CONSUME_CODE(
+            redis,
+            [f'{self.code_prefix}:{email}', f'{self.attempts_prefix}:{email}'],
+            [code, self.max_attempts, self.attempts_ttl * 1000],
+        )
+        result = _STATUSES[int(status)]
+        if result == CODE_VALID:
+            self._consumed += 1
+        elif result == CODE_LOCKED:
+            self._locked += 1
+        return result, int(remaining)
+
+    def stats(self) -> dict:
+        return {
+            'max_attempts': self.max_attempts,
+            'checked': self._checked,
+            'consumed': self._consumed,
+            'locked': self._locked,
+        }
+
+
+verification_store = VerificationStore(
+    code_prefix=settings.verification_code_prefix,
+    attempts_prefix=settings.verification_attempts_prefix,
+    max_attempts=settings.verification_max_attempts,
+    attempts_ttl=settings.verification_attempts_ttl,
+)
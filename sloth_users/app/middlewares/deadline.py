@@ -0,0 +1,21 @@
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.deadline import reset_deadline, set_deadline
+
+
+class DeadlineMiddleware:
+    """ASGI middleware, задающий бюджет времени запроса для дедлайнов обращений к внешним сервисам"""
+
+    def __init__(self, app: ASGIApp, budget: float) -> None:
+        self.app = app
+        self.budget = budget
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        token = set_deadline(self.budget)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            reset_deadline(token)
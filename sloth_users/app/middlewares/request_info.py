@@ -1,13 +1,21 @@
 from fastapi.requests import Request
 from pydantic.networks import IPvAnyAddress
-from fastapi import Depends, Header
+from fastapi import Header
+
+from app.core.logger import REDACTED
+from app.db.audit import audit_writer
+
+
+def redact_cookie(cookie: str | None) -> str | None:
+    """Заголовок Cookie без значений: в аудит попадают только имена cookie"""
+    if not cookie:
+        return None
+    names = (part.split('=', 1)[0].strip() for part in cookie.split(';'))
+    return '; '.join(f'{name}={REDACTED}' for name in names if name)
 
-from app.db.procedures import log_request
-from app.db import get_db
 
 async def set_request_info(
         request: Request,
-        conn = Depends(get_db),
         user_agent: str = Header(
             default=None,
             include_in_schema=False,
@@ -26,10 +34,11 @@ async def set_request_info(
             include_in_schema=False
         )
 ) -> None:
-    await log_request(
-        conn=conn,
+    # IP клиента нужен также для ограничения частоты запросов
+    request.state.real_ip = str(real_ip) if real_ip else None
+    audit_writer.enqueue(
         user_agent=user_agent,
-        cookie=cookie,
-        real_ip=str(real_ip) if real_ip else None,
+        cookie=redact_cookie(cookie),
+        real_ip=request.state.real_ip,
         referer=referer
-    )
\ No newline at end of file
+    )
@@ -1,10 +1,11 @@
 from uuid import UUID, uuid4
 from datetime import datetime
 from decimal import Decimal
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel, EmailStr, Field
 
+from app.core.config import settings
 from app.schemas.utils import PhoneNumber
 
 
@@ -122,9 +123,43 @@ class UserCreateResponse(BaseModel):
 
 
 
-class UserUpdate(BaseUser):
-    """Схема обновления пользователя"""
-    pass
+class UserUpdate(BaseModel):
+    """Схема частичного обновления пользователя: изменяются только переданные поля"""
+    username: Optional[str] = Field(
+        description='username',
+        default=None
+    )
+    email: Optional[EmailStr] = Field(
+        description='email пользователя',
+        default=None
+    )
+    hashed_pass: Optional[str] = Field(
+        description='новый пароль',
+        default=None
+    )
+    phone: Optional[PhoneNumber] = Field(
+        description='телефон пользователя',
+        default=None
+    )
+    is_verified: Optional[bool] = Field(
+        description='подтвержден ли пользователь',
+        default=None
+    )
+    rating: Optional[Decimal] = Field(
+        description='рейтинг пользователя',
+        default=None,
+        ge=1.00,
+        le=5.00,
+        decimal_places=2
+    )
+    role: Optional[str] = Field(
+        description='роль пользователя',
+        default=None
+    )
+
+    def changed_fields(self) -> Dict:
+        """Переданные поля без пароля; null, как и в прежней процедуре обновления, означает «не менять»"""
+        return self.model_dump(exclude_unset=True, exclude_none=True, exclude={'hashed_pass'})
 
 
 class GetUserResponse(UserCreateResponse):
@@ -137,6 +172,10 @@ class GetAllUsersListResponse(BaseModel):
     users: List[GetUserResponse] = Field(
         description='список пользователей'
     )
+    next_cursor: Optional[UUID] = Field(
+        description='курсор для запроса следующей страницы',
+        default=None
+    )
 
     class Config:
         json_schema_extra = {
@@ -166,6 +205,38 @@ class GetAllUsersListResponse(BaseModel):
                         "created_at": "2024-09-01T14:20:30",
                         "updated_at": "2024-09-01T14:20:30"
                     }
+                ],
+                "next_cursor": "d7fda6f1-16ae-4e7f-bb9b-df5e76b9b3ea"
+            }
+        }
+
+
+class BatchGetUsersRequest(BaseModel):
+    """Схема запроса пакетного получения пользователей"""
+    ids: List[UUID] = Field(
+        description='список идентификаторов пользователей',
+        min_length=1,
+        max_length=settings.users_batch_max_ids
+    )
+
+    model_config = {
+        "json_schema_extra": {
+            "example": {
+                "ids": [
+                    "c9bf9e57-1685-4c89-bafb-ff5af830be8a",
+                    "d7fda6f1-16ae-4e7f-bb9b-df5e76b9b3ea"
                 ]
             }
-        }
\ No newline at end of file
+        }
+    }
+
+
+class BatchGetUsersResponse(BaseModel):
+    """Схема ответа пакетного получения пользователей"""
+    users: Dict[UUID, GetUserResponse] = Field(
+        description='найденные пользователи по идентификатору'
+    )
+    missing: List[UUID] = Field(
+        description='идентификаторы, для которых пользователь не найден',
+        default_factory=list
+    )
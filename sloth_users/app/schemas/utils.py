@@ -1,19 +1,38 @@
-import phonenumbers
+from functools import lru_cache
+from typing import Any, Optional
+
+from pydantic import GetCoreSchemaHandler
+from pydantic_core import core_schema
+
+from app.core.config import settings
+
+
+@lru_cache(maxsize=settings.phone_validation_cache_size)
+def normalize_phone_number(value: str) -> tuple[Optional[str], Optional[str]]:
+    """Разбор и нормализация номера в E.164; возвращает (номер, ошибка), результат кэшируется"""
+    # phonenumbers с метаданными регионов загружается только при первой валидации
+    import phonenumbers
+
+    try:
+        phone = phonenumbers.parse(value)
+    except phonenumbers.phonenumberutil.NumberParseException:
+        return None, 'Invalid phone number format'
+    if not phonenumbers.is_valid_number(phone):
+        return None, 'Invalid phone number'
+    return phonenumbers.format_number(phone, phonenumbers.PhoneNumberFormat.E164), None
+
 
 class PhoneNumber(str):
     """Кастомный класс для валидации номера телефона"""
     @classmethod
-    def __get_validators__(cls):
-        yield cls.validate
+    def __get_pydantic_core_schema__(cls, source_type: Any, handler: GetCoreSchemaHandler) -> core_schema.CoreSchema:
+        return core_schema.no_info_after_validator_function(cls.validate, core_schema.str_schema())
 
     @classmethod
-    def validate(cls, value, *args, **kwargs):
+    def validate(cls, value: str) -> 'PhoneNumber':
         if not isinstance(value, str):
             raise TypeError('Number is not a string value')
-        try:
-            phone = phonenumbers.parse(value)
-            if not phonenumbers.is_valid_number(phone):
-                raise ValueError('Invalid phone number')
-        except phonenumbers.phonenumberutil.NumberParseException:
-            raise ValueError('Invalid phone number format')
-        return value
\ No newline at end of file
+        normalized, error = normalize_phone_number(value)
+        if error is not None:
+            raise ValueError(error)
+        return cls(normalized)
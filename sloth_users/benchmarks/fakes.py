@@ -0,0 +1,342 @@
+"""Локальные заменители внешних зависимостей для бенчмарков: сервис auth, пул Postgres и Redis."""
+import asyncio
+import hashlib
+import re
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from uuid import UUID, uuid4
+
+import jwt
+from fastapi import Body, FastAPI, HTTPException
+
+from app.core.config import settings
+from app.db.redis_scripts import CACHE_FILL, CACHE_INVALIDATE, CHECK_AND_CONSUME_CODE, TOKEN_BUCKET
+from app.db.statements import STATEMENTS
+
+ACCESS_TOKEN_TTL = 3600
+
+
+def issue_token(secret: str, user_id: Any, ttl: int = ACCESS_TOKEN_TTL, token_type: str = 'access') -> str:
+    """Access токен с claim aud и type, как у сервиса auth; token_type='password_reset' - токен сброса пароля"""
+    claims = {'sub': str(user_id), 'exp': int(time.time()) + ttl, 'type': token_type}
+    if token_type == 'access':
+        claims['aud'] = settings.jwt_access_audience
+    return jwt.encode(claims, secret, algorithm='HS256')
+
+
+def decode_access(token: str, secret: str) -> dict:
+    return jwt.decode(token, secret, algorithms=['HS256'], audience=settings.jwt_access_audience)
+
+
+def create_fake_auth_app(secret: str, latency: float = 0.0) -> FastAPI:
+    """In-process заменитель сервиса auth с эндпоинтами verify_token, login, refresh_token"""
+    auth = FastAPI()
+
+    async def delay() -> None:
+        if latency:
+            await asyncio.sleep(latency)
+
+    @auth.post('/api/v1/auth/verify_token')
+    async def verify_token(token: str = Body(..., embed=True)) -> dict:
+        await delay()
+        try:
+            payload = decode_access(token, secret)
+        except jwt.InvalidTokenError:
+            raise HTTPException(status_code=401, detail='Invalid token')
+        return {'user_id': payload['sub']}
+
+    @auth.post('/api/v1/auth/login')
+    async def login(user_id: str = Body(..., embed=True)) -> dict:
+        await delay()
+        return {'access_token': issue_token(secret, user_id), 'token_type': 'bearer'}
+
+    @auth.post('/api/v1/auth/refresh_token')
+    async def refresh_token(refresh_token: str = Body(..., embed=True)) -> dict:
+        await delay()
+        try:
+            payload = decode_access(refresh_token, secret)
+        except jwt.InvalidTokenError:
+            raise HTTPException(status_code=401, detail='Invalid refresh token')
+        return {'access_token': issue_token(secret, payload['sub']), 'token_type': 'bearer'}
+
+    @auth.post('/api/v1/auth/send_password_reset_link')
+    async def send_password_reset_link(email: str) -> dict:
+        await delay()
+        return {'message': 'sent'}
+
+    return auth
+
+
+class FakeRedis:
+    """Минимальный in-memory заменитель redis.asyncio.Redis; Lua-скрипты из app.db.redis_scripts
+    эмулируются на Python"""
+
+    def __init__(self) -> None:
+        self.data: Dict[str, Any] = {}
+        self.scripts = {
+            TOKEN_BUCKET.sha: self._token_bucket,
+            CHECK_AND_CONSUME_CODE.sha: self._check_and_consume_code,
+            CACHE_FILL.sha: self._cache_fill,
+            CACHE_INVALIDATE.sha: self._cache_invalidate,
+        }
+
+    async def get(self, key: str) -> Optional[str]:
+        return self.data.get(key)
+
+    async def mget(self, *keys: str) -> List[Optional[str]]:
+        return [self.data.get(key) for key in keys]
+
+    async def set(self, key: str, value: Any, ex: Optional[int] = None, **kwargs: Any) -> bool:
+        self.data[key] = value.decode() if isinstance(value, bytes) else value
+        return True
+
+    async def delete(self, *keys: str) -> int:
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    async def exists(self, *keys: str) -> int:
+        return sum(key in self.data for key in keys)
+
+    async def evalsha(self, sha: str, numkeys: int, *keys_and_args: Any) -> Any:
+        return self.scripts[sha](list(keys_and_args[:numkeys]), list(keys_and_args[numkeys:]))
+
+    async def eval(self, script: str, numkeys: int, *keys_and_args: Any) -> Any:
+        return await self.evalsha(hashlib.sha1(script.encode('utf-8')).hexdigest(), numkeys, *keys_and_args)
+
+    def _token_bucket(self, keys: List[str], args: List[Any]) -> str:
+        now, cost = float(args[0]), float(args[1])
+        limits = [(float(args[2 + i * 2]), float(args[3 + i * 2])) for i in range(len(keys))]
+        tokens = []
+        wait = 0.0
+        for key, (rate, burst) in zip(keys, limits):
+            available, ts = self.data.get(key, (burst, now))
+            available = min(burst, available + max(0.0, now - ts) * rate)
+            if available < cost:
+                wait = max(wait, (cost - available) / rate)
+            tokens.append(available)
+        if wait > 0:
+            return str(wait)
+        for key, available in zip(keys, tokens):
+            self.data[key] = (available - cost, now)
+        return '0'
+
+    def _check_and_consume_code(self, keys: List[str], args: List[Any]) -> List[int]:
+        code_key, attempts_key = keys
+        max_attempts = int(args[1])
+        stored = self.data.get(code_key)
+        if stored is None:
+            return [-1, 0]
+        attempts = int(self.data.get(attempts_key, 0))
+        if attempts < max_attempts and stored == str(args[0]):
+            self.data.pop(attempts_key, None)
+            del self.data[code_key]
+            return [1, max_attempts - attempts]
+        attempts += 1
+        if attempts >= max_attempts:
+            self.data.pop(attempts_key, None)
+            del self.data[code_key]
+            return [-2, 0]
+        self.data[attempts_key] = attempts
+        return [0, max_attempts - attempts]
+
+    def _cache_fill(self, keys: List[str], args: List[Any]) -> int:
+        key, version_key = keys
+        if str(self.data.get(version_key, '')) != str(args[2]):
+            return 0
+        value = args[0]
+        self.data[key] = value.decode() if isinstance(value, bytes) else value
+        return 1
+
+    def _cache_invalidate(self, keys: List[str], args: List[Any]) -> int:
+        key, version_key = keys
+        self.data[version_key] = str(int(self.data.get(version_key, 0)) + 1)
+        self.data.pop(key, None)
+        return 1
+
+    async def aclose(self) -> None:
+        pass
+
+
+class FakeDatabase:
+    """In-memory состояние таблиц users и passwords"""
+
+    def __init__(self) -> None:
+        self.users: Dict[UUID, dict] = {}
+        self.passwords: List[dict] = []
+
+    def latest_password(self, user_id: UUID) -> Optional[str]:
+        history = [p for p in self.passwords if p['user_id'] == user_id]
+        return max(history, key=lambda p: p['created_at'])['hashed_pass'] if history else None
+
+
+class _FakeTransaction:
+    async def __aenter__(self) -> None:
+        return None
+
+    async def __aexit__(self, *exc: Any) -> None:
+        return None
+
+
+class FakeStatement:
+    def __init__(self, conn: 'FakeConnection', query: str) -> None:
+        self.conn = conn
+        self.name = conn.statement_names.get(query)
+
+    async def fetch(self, *args: Any) -> List[dict]:
+        return await self.conn.run(self.name, *args)
+
+    async def fetchrow(self, *args: Any) -> Optional[dict]:
+        rows = await self.conn.run(self.name, *args)
+        return rows[0] if rows else None
+
+    async def fetchval(self, *args: Any) -> Any:
+        row = await self.fetchrow(*args)
+        return next(iter(row.values())) if row else None
+
+
+class FakeConnection:
+    """Заменитель соединения asyncpg, понимающий запросы из реестра app.db.statements"""
+
+    statement_names = {query: name for name, query in STATEMENTS.items()}
+
+    def __init__(self, db: FakeDatabase, latency: float = 0.0) -> None:
+        self.db = db
+        self.latency = latency
+
+    async def prepare(self, query: str) -> FakeStatement:
+        return FakeStatement(self, query)
+
+    def transaction(self, **kwargs: Any) -> _FakeTransaction:
+        return _FakeTransaction()
+
+    async def set_type_codec(self, *args: Any, **kwargs: Any) -> None:
+        pass
+
+    async def copy_records_to_table(self, table: str, records: List[tuple], columns: List[str]) -> None:
+        await self._round_trip()
+        for record in records:
+            row = dict(zip(columns, record))
+            if table == 'users':
+                self.db.users[row['id']] = row
+            elif table == 'passwords':
+                self.db.passwords.append(row)
+
+    async def cursor(self, query: str, *args: Any, prefetch: int = 0):
+        name = 'get_users_page_by_role' if 'role =' in query else 'get_users_page'
+        for row in await self.run(name, *args, None):
+            yield row
+
+    async def fetchrow(self, query: str, *args: Any) -> Optional[dict]:
+        """Динамический частичный UPDATE ... RETURNING из db.procedures"""
+        await self._round_trip()
+        user = self.db.users.get(args[0])
+        if user is None:
+            return None
+        for field, index in re.findall(r'(\w+) = \$(\d+)', query.split('WHERE')[0]):
+            user[field] = args[int(index) - 1]
+        user['updated_at'] = datetime.now()
+        if 'INSERT INTO passwords' in query:
+            self.db.passwords.append({'user_id': user['id'], 'hashed_pass': args[-1], 'created_at': datetime.now()})
+        return dict(user)
+
+    async def _round_trip(self) -> None:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def run(self, name: Optional[str], *args: Any) -> List[dict]:
+        await self._round_trip()
+        db = self.db
+        if name == 'get_user_by_id':
+            user = db.users.get(args[0])
+            return [{**user, 'hashed_pass': db.latest_password(user['id'])}] if user else []
+        if name in ('get_users_page', 'get_users_page_by_role'):
+            if name == 'get_users_page':
+                (after, is_verified, limit), role = args, None
+            else:
+                after, is_verified, role, limit = args
+            rows = sorted(db.users.values(), key=lambda u: str(u['id']))
+            rows = [
+                u for u in rows
+                if (after is None or str(u['id']) > str(after))
+                and (role is None or u['role'] == role)
+                and (is_verified is None or u['is_verified'] == is_verified)
+            ]
+            return rows[:limit] if limit else rows
+        if name == 'get_users_by_ids':
+            return [db.users[i] for i in args[0] if i in db.users]
+        if name == 'get_user_id_by_email':
+            return [{'id': u['id']} for u in db.users.values() if u['email'] == args[0]][:1]
+        if name == 'get_existing_emails':
+            emails = set(args[0])
+            return [{'email': u['email']} for u in db.users.values() if u['email'] in emails]
+        if name == 'get_password_history':
+            history = sorted(
+                (p for p in db.passwords if p['user_id'] == args[0]),
+                key=lambda p: p['created_at'], reverse=True
+            )
+            return history[:args[1]]
+        if name == 'insert_password':
+            db.passwords.append({'user_id': args[0], 'hashed_pass': args[1], 'created_at': datetime.now()})
+            return []
+        if name == 'rehash_password':
+            user_id, old_hash, new_hash = args
+            history = [p for p in db.passwords if p['user_id'] == user_id]
+            current = max(history, key=lambda p: p['created_at'], default=None)
+            if current is None or current['hashed_pass'] != old_hash:
+                return []
+            current['hashed_pass'] = new_hash
+            return [{'user_id': user_id}]
+        if name == 'mark_user_verified':
+            user = db.users.get(args[0])
+            if user is None or user['email'] != args[1]:
+                return []
+            user['is_verified'] = True
+            return [{'id': user['id']}]
+        if name == 'delete_user_by_id':
+            db.users.pop(args[0], None)
+            db.passwords = [p for p in db.passwords if p['user_id'] != args[0]]
+            return []
+        if name == 'create_user_procedure':
+            username, email, hashed_pass, phone, is_verified, rating, role = args
+            user_id = uuid4()
+            now = datetime.now()
+            db.users[user_id] = {
+                'id': user_id, 'username': username, 'email': email, 'phone': phone,
+                'is_verified': is_verified, 'rating': rating, 'role': role,
+                'created_at': now, 'updated_at': now,
+            }
+            db.passwords.append({'user_id': user_id, 'hashed_pass': hashed_pass, 'created_at': now})
+            return [{'p_user_id': user_id}]
+        raise NotImplementedError(f'FakeConnection does not support statement {name!r}')
+
+
+class FakePool:
+    """Заменитель asyncpg.Pool поверх FakeConnection"""
+
+    def __init__(self, db: FakeDatabase, size: int = 10, latency: float = 0.0) -> None:
+        self._free = asyncio.Queue()
+        self._size = size
+        for _ in range(size):
+            self._free.put_nowait(FakeConnection(db, latency))
+
+    async def acquire(self, timeout: Optional[float] = None) -> FakeConnection:
+        return await asyncio.wait_for(self._free.get(), timeout)
+
+    async def release(self, conn: FakeConnection) -> None:
+        self._free.put_nowait(conn)
+
+    async def close(self) -> None:
+        pass
+
+    def get_size(self) -> int:
+        return self._size
+
+    def get_idle_size(self) -> int:
+        return self._free.qsize()
+
+    def get_min_size(self) -> int:
+        return self._size
+
+    def get_max_size(self) -> int:
+        return self._size
+
@@ -0,0 +1,80 @@
+"""Микробенчмарк сериализации ответа с пользователем: путь через pydantic-модели против прямой сериализации записи.
+
+Запуск: python -m benchmarks.serialization --rows 10000
+"""
+import argparse
+import json
+import time
+from datetime import datetime
+from uuid import uuid4
+
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from app.api.utils.responses import FastJSONResponse, encode_user
+from app.schemas.users import GetUserResponse
+
+
+def make_rows(count: int) -> list[dict]:
+    now = datetime.now()
+    return [
+        {
+            'id': uuid4(),
+            'username': f'user_{i}',
+            'email': f'user_{i}@example.com',
+            'hashed_pass': '$2b$12$' + 'x' * 53,
+            'phone': '+79161234567',
+            'is_verified': i % 2 == 0,
+            'rating': 4.5,
+            'role': 'user',
+            'created_at': now,
+            'updated_at': now,
+        }
+        for i in range(count)
+    ]
+
+
+def model_path(rows: list[dict]) -> None:
+    """Record -> dict -> GetUserResponse -> повторная валидация response_model -> JSON"""
+    adapter = TypeAdapter(GetUserResponse)
+    for row in rows:
+        model = GetUserResponse(**dict(row))
+        value = adapter.validate_python(model, from_attributes=True)
+        JSONResponse(adapter.dump_python(value, mode='json'))
+
+
+def fast_path(rows: list[dict]) -> None:
+    """Record -> проекция полей -> JSON через pydantic-core"""
+    for row in rows:
+        FastJSONResponse(encode_user(row))
+
+
+def measure(func, rows: list[dict], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(rows)
+        best = min(best, time.perf_counter() - started)
+    return best / len(rows) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    before = measure(model_path, rows, args.repeat)
+    after = measure(fast_path, rows, args.repeat)
+    print(json.dumps({
+        'benchmark': 'user_serialization',
+        'rows': args.rows,
+        'model_path_us_per_row': round(before, 3),
+        'fast_path_us_per_row': round(after, 3),
+        'speedup': round(before / after, 2) if after else None,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
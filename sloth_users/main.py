@@ -1,21 +1,25 @@
 from fastapi import FastAPI
-from logging import config as logging_config
-from typing import Any
-
 from app.api.routes.users import router
+from app.api.routes.service import router as service_router
+from app.api.routes.metrics import router as metrics_router
+from app.api.utils.auth_client import AuthServiceUnavailable, auth_unavailable_handler
 from app.core.config import settings
-from app.core.logger import get_logging_config
-from app.db import lifespan
+from app.core.logger import setup_logging
+from app.core.lifespan import lifespan
+from app.middlewares.deadline import DeadlineMiddleware
+from app.middlewares.metrics import MetricsMiddleware
 
 app = FastAPI(lifespan=lifespan)
+app.add_middleware(DeadlineMiddleware, budget=settings.request_budget)
+app.add_middleware(MetricsMiddleware)
+app.add_exception_handler(AuthServiceUnavailable, auth_unavailable_handler)
 
-log_config: dict[str, Any] = get_logging_config(
-    log_level="INFO",
-)
-logging_config.dictConfig(config=log_config)
+setup_logging(log_level=settings.log_level.upper())
 # Подключаем маршруты из модуля users
 app.include_router(router=router)
+app.include_router(router=service_router)
+app.include_router(router=metrics_router)
 
 if __name__ == '__main__':
-    import uvicorn
-    uvicorn.run('main:app', host='127.0.0.1', port=8000, log_level="INFO")
\ No newline at end of file
+    from app.core.server import run_server
+    run_server('main:app')
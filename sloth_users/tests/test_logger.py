@@ -0,0 +1,13 @@
+from app.core.logger import redact
+
+
+def test_redact_masks_whole_bearer_token_under_authorization_key():
+    assert redact("{'authorization': 'Bearer opaque-token-123'}") == "{'authorization': '***'}"
+
+
+def test_redact_masks_quoted_value_with_spaces():
+    assert redact('{"password": "correct horse battery staple"}') == '{"password": "***"}'
+
+
+def test_redact_masks_compound_keys():
+    assert redact('verification_code=123456') == 'verification_code=***'